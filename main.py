@@ -1,19 +1,30 @@
+import atexit
 import logging
+import queue
 import sys
+from logging.handlers import QueueHandler, QueueListener
 from src.config import config
 from src.etl.loader import get_data_loader
 from src.strategies.gold_breakout import GoldBreakout
 from src.production.trader import LiveTrader
 
 # Setup Logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.StreamHandler(sys.stdout),
-        logging.FileHandler("system.log")
-    ]
-)
+# Records are enqueued on the calling thread and written by a background listener,
+# so the trading loop never blocks on console/disk I/O.
+log_formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+stream_handler = logging.StreamHandler(sys.stdout)
+stream_handler.setFormatter(log_formatter)
+file_handler = logging.FileHandler("system.log")
+file_handler.setFormatter(log_formatter)
+
+log_queue = queue.SimpleQueue()
+queue_handler = QueueHandler(log_queue)
+queue_handler.setFormatter(logging.Formatter('%(message)s'))  # Final layout is applied by the listener's handlers
+log_listener = QueueListener(log_queue, stream_handler, file_handler, respect_handler_level=True)
+logging.basicConfig(level=logging.INFO, handlers=[queue_handler])
+log_listener.start()
+atexit.register(log_listener.stop)
+
 logger = logging.getLogger("Main")
 
 def main():
@@ -4,14 +4,50 @@ import pytz
 from datetime import datetime, time, timedelta
 import logging
 from pathlib import Path
+import matplotlib
+matplotlib.use('Agg')  # File output only: skip GUI backend imports
 import matplotlib.pyplot as plt
 
+# Let Agg drop sub-pixel vertices from long equity lines
+plt.rcParams['path.simplify'] = True
+plt.rcParams['path.simplify_threshold'] = 1.0
+
+try:
+    # Multithreaded C++ CSV reader (via pandas), Parquet cache of parsed data
+    import pyarrow as pa
+    import pyarrow.parquet as pa_parquet
+    CSV_ENGINE = 'pyarrow'
+except ImportError:
+    pa = None
+    CSV_ENGINE = 'c'
+
+try:
+    from numba import njit, prange
+except ImportError:
+    # Numba is optional: without it the kernels below run as plain Python
+    def njit(*args, **kwargs):
+        if len(args) == 1 and callable(args[0]):
+            return args[0]
+        return lambda fn: fn
+    prange = range
+
 # --- Configuration ---
 DATA_PATH = Path("src/mt5_data/XAUUSD15.csv")
 OUTPUT_TRADES_PATH = Path("breakout_trades.csv")
 OUTPUT_EQUITY_PATH = Path("breakout_equity.csv")
 OUTPUT_PLOT_PATH = Path("breakout_curve.png")
 
+# Session boundaries (IST) as minute-of-day: 03:30, 13:30, 21:30
+ASIAN_START_M = 3 * 60 + 30
+ASIAN_END_M = 13 * 60 + 30
+TRADE_END_M = 21 * 60 + 30
+
+# The simulation runs on integer price ticks (XAUUSD quotes to 0.01; 1 Pip = 0.10 Price)
+TICKS_PER_PRICE = 100
+TICKS_PER_PIP = 10
+NO_RANGE_HIGH = np.iinfo(np.int32).max  # Asian-range sentinels for dates without Asian candles
+NO_RANGE_LOW = np.iinfo(np.int32).min
+
 # Logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
@@ -77,11 +113,89 @@ def get_user_inputs():
     }
     return inputs
 
+def _localize_to_utc_ns(wall_ns, tz):
+    """
+    Vectorized tz_localize(ambiguous='NaT', nonexistent='shift_forward') for a pytz zone.
+    Maps naive wall-clock int64 ns to UTC int64 ns with a single searchsorted over the
+    zone's DST transition table; ambiguous (fall-back) times come back as NaT.
+    """
+    trans = np.array(tz._utc_transition_times, dtype='datetime64[s]').astype(np.int64)
+    trans = np.maximum(trans, -2**33) * 10**9  # First entry is datetime.min; clip before scaling to ns
+    offsets = np.array([info[0].total_seconds() for info in tz._transition_info], dtype=np.int64) * 10**9
+    last = len(trans) - 1
+
+    # Offset in force at each wall time, keyed by the wall time at which each offset starts
+    idx = np.clip(np.searchsorted(trans + offsets, wall_ns, side='right') - 1, 0, last)
+    utc = wall_ns - offsets[idx]
+
+    # Spring forward: wall times inside the gap shift forward to the transition instant
+    nxt = np.minimum(idx + 1, last)
+    utc = np.where((idx < last) & (utc >= trans[nxt]), trans[nxt], utc)
+
+    # Fall back: wall times that occur twice are dropped
+    prev = np.maximum(idx - 1, 0)
+    utc[(idx > 0) & (wall_ns - offsets[prev] < trans[idx])] = np.iinfo(np.int64).min
+    return utc
+
+# Parsed-data cache: bump when load_data's output columns change so stale caches are ignored
+LOAD_CACHE_VERSION = 1
+_LOAD_CACHE_KEY = b'load_cache_key'
+
+def _load_cache_path(path):
+    return path.with_name(path.name + '.parquet')
+
+def _read_load_cache(cache_path, key):
+    """The cached frame if cache_path was written for key, else None."""
+    if not cache_path.exists():
+        return None
+    try:
+        metadata = pa_parquet.read_schema(cache_path).metadata or {}
+        if metadata.get(_LOAD_CACHE_KEY) != key:
+            return None
+        return pa_parquet.read_table(cache_path).to_pandas()
+    except Exception as e:
+        logger.warning(f"Ignoring unreadable data cache {cache_path}: {e}")
+        return None
+
+def _write_load_cache(df, cache_path, key):
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    table = table.replace_schema_metadata({**(table.schema.metadata or {}), _LOAD_CACHE_KEY: key})
+    try:
+        pa_parquet.write_table(table, cache_path, compression='zstd')
+    except OSError as e:
+        logger.warning(f"Could not write data cache {cache_path}: {e}")
+
 def load_data(path):
+    """
+    Parsed candles for the CSV at path. With pyarrow installed the result is cached as
+    Parquet next to the CSV and reused until the CSV's size or mtime changes.
+    """
+    path = Path(path)
+    if pa is None:
+        return _parse_data(path)
+
+    stat = path.stat()
+    key = f"{LOAD_CACHE_VERSION}:{stat.st_size}:{stat.st_mtime_ns}".encode()
+    cache_path = _load_cache_path(path)
+
+    df = _read_load_cache(cache_path, key)
+    if df is not None:
+        logger.info(f"Loaded {len(df)} candles from cache {cache_path}.")
+        return df
+
+    df = _parse_data(path)
+    _write_load_cache(df, cache_path, key)
+    return df
+
+def _parse_data(path):
     logger.info(f"Loading data from {path}...")
     # Read CSV: Time, Open, High, Low, Close, Vol
+    # Explicit dtypes skip per-column type inference; the pyarrow engine also parses
+    # ISO timestamps natively, leaving to_datetime below with nothing to do
     df = pd.read_csv(path, sep='\t', header=None, 
-                     names=["time_str", "open", "high", "low", "close", "vol"])
+                     names=["time_str", "open", "high", "low", "close", "vol"],
+                     dtype={'open': 'float64', 'high': 'float64', 'low': 'float64', 'close': 'float64'},
+                     engine=CSV_ENGINE)
     
     # Parse Time
     logger.info("Parsing timestamps...")
@@ -91,10 +205,12 @@ def load_data(path):
     src_tz = pytz.timezone('Europe/Athens')
     dst_tz = pytz.timezone('Asia/Kolkata')
     
-    # Vectorized TZ conversion (approximate for speed, usually accurately enough for backtest range)
-    # Note: 'ambiguous' handling might drop DST switch hour
+    # Vectorized TZ conversion on the int64 ns view (one searchsorted over Athens DST transitions)
+    # Note: 'ambiguous' handling drops the DST switch hour
     try:
-        df['time_ist'] = df['time'].dt.tz_localize('Europe/Athens', ambiguous='NaT', nonexistent='shift_forward').dt.tz_convert('Asia/Kolkata')
+        wall_ns = df['time'].to_numpy('datetime64[ns]').view(np.int64)
+        utc_ns = _localize_to_utc_ns(wall_ns, src_tz)
+        df['time_ist'] = pd.DatetimeIndex(utc_ns.view('datetime64[ns]'), tz='UTC').tz_convert(dst_tz)
     except Exception:
         # Fallback to slow apply if vectorized fails hard
         def convert_tz(dt):
@@ -103,11 +219,187 @@ def load_data(path):
         df['time_ist'] = df['time'].apply(convert_tz)
         
     df = df.dropna(subset=['time_ist']).reset_index(drop=True)
+
+    # Integer minute-of-day so session checks are plain int compares
+    df['mod'] = (df['time_ist'].dt.hour * 60 + df['time_ist'].dt.minute).astype(np.int16)
+
+    # Integer tick prices: exact comparisons and half the bytes of float64
+    for col in ('high', 'low', 'close'):
+        df[f'{col}_t'] = np.rint(df[col].to_numpy() * TICKS_PER_PRICE).astype(np.int32)
+
+    # Asian-session High/Low (ticks) per IST date, broadcast to every candle of that date,
+    # so the simulation never tracks a running range. Dates without Asian candles get
+    # sentinels no close can break.
+    session_date = df['time_ist'].dt.normalize()
+    is_asian = (df['mod'] >= ASIAN_START_M) & (df['mod'] < ASIAN_END_M)
+    asian = df[is_asian].groupby(session_date[is_asian])
+    df['asian_hi_t'] = session_date.map(asian['high_t'].max()).fillna(NO_RANGE_HIGH).astype(np.int32)
+    df['asian_lo_t'] = session_date.map(asian['low_t'].min()).fillna(NO_RANGE_LOW).astype(np.int32)
+
+    # First Asian candle of each date arms the range, even when the 03:30 candle itself is missing
+    df['asian_open'] = False
+    df.loc[asian.head(1).index, 'asian_open'] = True
     logger.info(f"Loaded {len(df)} candles.")
     return df
 
+# Reason codes emitted by the simulation kernel
+REASONS = np.array(["SL", "TP", "Session Close"])
+
+def _entry_candidates(asian_open, minutes_of_day, closes, asian_highs, asian_lows):
+    """
+    Vectorized entry detection: a candle is a candidate when it is in the trade session,
+    the Asian range is armed (a session's first Asian candle seen since the last TRADE_END
+    candle) and the close breaks the range.
+    Returns (entry_mask, next_entry) where next_entry[i] is the first candidate >= i (n if none).
+    """
+    n = len(minutes_of_day)
+    idx = np.arange(n)
+    last_set = np.maximum.accumulate(np.where(asian_open, idx, -1))
+    last_reset = np.maximum.accumulate(np.where(minutes_of_day >= TRADE_END_M, idx, -1))
+    range_set = last_set > last_reset
+
+    is_trade = (minutes_of_day >= ASIAN_END_M) & (minutes_of_day < TRADE_END_M)
+    breakout = (closes > asian_highs) | (closes < asian_lows)
+    entry_mask = is_trade & range_set & breakout
+
+    # Suffix-min of candidate indices, with a sentinel slot so next_entry[n] == n
+    next_entry = np.append(np.where(entry_mask, idx, n), n)
+    next_entry = np.minimum.accumulate(next_entry[::-1])[::-1]
+    return entry_mask, next_entry
+
+@njit(cache=True)
+def _simulate_njit(highs, lows, closes, minutes_of_day, asian_highs, entry_mask, next_entry, n,
+                   sl_ticks, tp_ticks, trail_trig_ticks, trail_dist_ticks,
+                   initial_equity, mode_is_fixed, fixed_lots, risk_pct, trade_end_m):
+    """
+    Bar-by-bar breakout simulation over int32 tick-price arrays; entry candidates come
+    precomputed from _entry_candidates, so flat stretches are skipped in one jump.
+    Returns the trade log as parallel arrays (one slot per trade, prices in ticks)
+    plus the final equity.
+    """
+    # Every trade exits on a later bar than the previous exit, so n slots always suffice
+    entry_idx_out = np.empty(n, np.int64)
+    exit_idx_out = np.empty(n, np.int64)
+    dir_out = np.empty(n, np.int8)        # +1 = long, -1 = short
+    entry_px_out = np.empty(n, np.int64)
+    exit_px_out = np.empty(n, np.int64)
+    size_out = np.empty(n, np.float64)
+    pnl_out = np.empty(n, np.float64)
+    reason_out = np.empty(n, np.int8)     # Index into REASONS
+    equity_out = np.empty(n, np.float64)
+    n_trades = 0
+
+    equity = initial_equity
+
+    # Position state as scalars; direction is +1 (long) or -1 (short) so both sides
+    # share one code path: "price moved in our favour by x" is direction * (price - ref) >= x
+    in_pos = False
+    direction = 1
+    entry_px = 0
+    sl = 0
+    tp = 0
+    size = 0.0
+    entry_idx = 0
+
+    i = next_entry[0]
+    while i < n:
+        m = minutes_of_day[i]
+        curr_high = highs[i]
+        curr_low = lows[i]
+        curr_close = closes[i]
+
+        # 1. Manage Existing Position
+        if in_pos:
+            # Extreme against / in favour of the position (compiles to a select, not a branch)
+            adverse = curr_low if direction > 0 else curr_high
+            favourable = curr_high if direction > 0 else curr_low
+
+            exit_price = 0
+            reason = -1
+            if direction * (sl - adverse) >= 0:
+                exit_price = sl
+                reason = 0
+            elif direction * (favourable - tp) >= 0:
+                exit_price = tp
+                reason = 1
+            elif m >= trade_end_m:
+                exit_price = curr_close
+                reason = 2
+
+            # Trailing: once price moves Trigger in favour, trail by Dist
+            if reason < 0:
+                if direction * (favourable - entry_px) >= trail_trig_ticks:
+                    new_sl = favourable - direction * trail_dist_ticks
+                    if direction * (new_sl - sl) > 0:
+                        sl = new_sl
+
+            if reason >= 0:
+                # XAUUSD: 1 lot = 100 oz, so PnL = PriceDiff * 100 * Lots
+                pnl = direction * (exit_price - entry_px) / TICKS_PER_PRICE * 100.0 * size
+                equity += pnl
+
+                entry_idx_out[n_trades] = entry_idx
+                exit_idx_out[n_trades] = i
+                dir_out[n_trades] = direction
+                entry_px_out[n_trades] = entry_px
+                exit_px_out[n_trades] = exit_price
+                size_out[n_trades] = size
+                pnl_out[n_trades] = pnl
+                reason_out[n_trades] = reason
+                equity_out[n_trades] = equity
+                n_trades += 1
+                in_pos = False
+
+        # 2. Entry Logic (fixed-distance SL/TP from the entry close)
+        if not in_pos and entry_mask[i]:
+            entry_dir = 1 if curr_close > asian_highs[i] else -1
+
+            # Sizing
+            if mode_is_fixed:
+                lots = fixed_lots
+            else:
+                # Lots = Risk / (SL_Dist * 100)
+                risk_amt = equity * risk_pct
+                sl_dist = sl_ticks / TICKS_PER_PRICE
+                if sl_dist == 0:
+                    sl_dist = 0.1
+                lots = round(risk_amt / (sl_dist * 100.0), 2)
+                if lots < 0.01:
+                    lots = 0.01
+
+            in_pos = True
+            direction = entry_dir
+            entry_px = curr_close
+            sl = curr_close - entry_dir * sl_ticks
+            tp = curr_close + entry_dir * tp_ticks
+            size = lots
+            entry_idx = i
+
+        # 3. Advance: bar by bar while holding, otherwise straight to the next candidate
+        if in_pos:
+            i += 1
+        else:
+            i = next_entry[i + 1]
+
+    return (n_trades, entry_idx_out, exit_idx_out, dir_out, entry_px_out, exit_px_out,
+            size_out, pnl_out, reason_out, equity_out, equity)
+
+def _pips_to_ticks(pips):
+    return int(round(pips * TICKS_PER_PIP))
+
+def _kernel_inputs(df):
+    """Contiguous price / session arrays plus the entry candidates, in _simulate_njit argument order."""
+    minutes = df['mod'].to_numpy(np.int16)
+    highs = df['high_t'].to_numpy(np.int32)
+    lows = df['low_t'].to_numpy(np.int32)
+    closes = df['close_t'].to_numpy(np.int32)
+    asian_highs = df['asian_hi_t'].to_numpy(np.int32)
+    asian_lows = df['asian_lo_t'].to_numpy(np.int32)
+    asian_open = df['asian_open'].to_numpy(np.bool_)
+    entry_mask, next_entry = _entry_candidates(asian_open, minutes, closes, asian_highs, asian_lows)
+    return highs, lows, closes, minutes, asian_highs, entry_mask, next_entry
+
 def run_backtest(df, config):
-    trades = []
     equity = config['initial_capital']
     
     # -- Date Filtering --
@@ -124,189 +416,116 @@ def run_backtest(df, config):
     print(f"\nBacktesting Range: {df['time_ist'].iloc[0]} to {df['time_ist'].iloc[-1]}")
     print(f"Total Candles: {len(df)}")
     
-    equity_curve = [{'time': df['time_ist'].iloc[0], 'equity': equity}]
-    
-    # Unpack Config
-    ASIAN_START = time(3, 30)
-    ASIAN_END = time(13, 30)
-    TRADE_END = time(21, 30)
-    
-    SL_PIPS = config['sl_pips']
-    TP_PIPS = config['tp_pips']
-    PIP_VAL_PRICE = 0.10 # 1 Pip = 0.10 Price
-    
-    # State
-    in_position = False
-    position = None 
-    asian_high = -1.0
-    asian_low = 1000000.0
-    range_set = False
-    
-    # Pre-computation
-    time_col = df['time_ist'].dt.time
-    highs = df['high'].values
-    lows = df['low'].values
-    closes = df['close'].values
+    highs, lows, closes, minutes, asian_highs, entry_mask, next_entry = _kernel_inputs(df)
     times = df['time_ist'].values
     
     logger.info(f"Running simulation with {config['mode']} sizing...")
     
-    for i in range(len(df)):
-        t = time_col[i]
-        curr_high = highs[i]
-        curr_low = lows[i]
-        curr_close = closes[i]
-        curr_time = times[i]
-        
-        # 1. Manage Existing Position
-        if in_position:
-            p = position
-            exit_price = None
-            exit_reason = ""
-            
-            p['duration'] += 15 # Add 15 mins
-            
-            # Check SL/TP
-            if p['type'] == 'long':
-                if curr_low <= p['sl']:
-                    exit_price = p['sl']
-                    exit_reason = "SL"
-                elif curr_high >= p['tp']:
-                    exit_price = p['tp']
-                    exit_reason = "TP"
-                elif t >= TRADE_END:
-                    exit_price = curr_close
-                    exit_reason = "Session Close"
-                
-                # Trailing
-                if not exit_price:
-                    # Logic: If price moves favorably by Trigger, Trail by Dist
-                    # "trail_points = 20 * 10" -> 20 Pips trigger
-                    trigger_price = p['entry_price'] + (config['trail_trigger'] * PIP_VAL_PRICE)
-                    if curr_high >= trigger_price:
-                        # Trail to High - TrailDist
-                        # "trail_offset = 5 * 10" -> 5 Pips distance
-                        new_sl = curr_high - (config['trail_dist'] * PIP_VAL_PRICE)
-                        if new_sl > p['sl']:
-                            p['sl'] = new_sl
-                            
-            else: # Short
-                if curr_high >= p['sl']:
-                    exit_price = p['sl']
-                    exit_reason = "SL"
-                elif curr_low <= p['tp']:
-                    exit_price = p['tp']
-                    exit_reason = "TP"
-                elif t >= TRADE_END:
-                    exit_price = curr_close
-                    exit_reason = "Session Close"
-                    
-                # Trailing
-                if not exit_price:
-                    trigger_price = p['entry_price'] - (config['trail_trigger'] * PIP_VAL_PRICE)
-                    if curr_low <= trigger_price:
-                        new_sl = curr_low + (config['trail_dist'] * PIP_VAL_PRICE)
-                        if new_sl < p['sl']:
-                            p['sl'] = new_sl
-
-            if exit_price:
-                # Calculate PnL
-                # Standard Lot (1.0) = $10 per pip? 
-                # XAUUSD: 1 lot = 100 oz. 1 pip (0.10) move = $10.
-                # Profit = (Diff / 0.10) * 10 * Lots = Diff * 100 * Lots?
-                # Wait. Price Diff $1.00 = 10 Pips. 
-                # 1 Lot ($1 move) = $100 Profit.
-                # So PnL = PriceDiff * 100 * Lots.
-                
-                price_diff = (exit_price - p['entry_price']) if p['type'] == 'long' else (p['entry_price'] - exit_price)
-                pnl = price_diff * 100.0 * p['size']
-                
-                equity += pnl
-                trades.append({
-                    'entry_time': p['entry_time_val'],
-                    'exit_time': curr_time,
-                    'type': p['type'],
-                    'entry_price': p['entry_price'],
-                    'exit_price': exit_price,
-                    'size': p['size'],
-                    'pnl': pnl,
-                    'reason': exit_reason,
-                    'equity_after': equity
-                })
-                in_position = False
-                position = None
-        
-        # 2. Session Logic
-        is_asian = (t >= ASIAN_START) and (t < ASIAN_END)
-        is_trade = (t >= ASIAN_END) and (t < TRADE_END)
-        
-        if t == ASIAN_START:
-            asian_high = curr_high
-            asian_low = curr_low
-            range_set = True
-        elif is_asian:
-            asian_high = max(asian_high, curr_high)
-            asian_low = min(asian_low, curr_low)
-            
-        # 3. Entry Logic
-        if is_trade and not in_position and range_set:
-            sl_dist_price = SL_PIPS * PIP_VAL_PRICE
-            tp_dist_price = TP_PIPS * PIP_VAL_PRICE
-            entry_signal = None
-            
-            if curr_close > asian_high:
-                entry_signal = 'long'
-                sl_price = asian_high - sl_dist_price # Asian Low or fixed distance? User said "Stop Loss (Pips)"
-                # "use stoploss in SL instead of points" -> implies fixed distance SL.
-                # Let's use Entry - SL_Pips.
-                entry_price = curr_close
-                sl_price = entry_price - sl_dist_price
-                tp_price = entry_price + tp_dist_price
-                
-            elif curr_close < asian_low:
-                entry_signal = 'short'
-                entry_price = curr_close
-                sl_price = entry_price + sl_dist_price
-                tp_price = entry_price - tp_dist_price
-                
-            if entry_signal:
-                # Sizing
-                lots = 0.0
-                if config['mode'] == 'fixed':
-                    lots = config['fixed_lots']
-                else:
-                    risk_amt = equity * config['risk_pct']
-                    # Risk = SL_Distance * 100 * Lots
-                    # Lots = Risk / (SL_Dist * 100)
-                    sl_dist = abs(entry_price - sl_price)
-                    if sl_dist == 0: sl_dist = 0.1
-                    lots = risk_amt / (sl_dist * 100.0)
-                    lots = round(lots, 2)
-                    if lots < 0.01: lots = 0.01
-
-                position = {
-                    'type': entry_signal,
-                    'entry_time_val': curr_time,
-                    'entry_price': entry_price,
-                    'sl': sl_price,
-                    'tp': tp_price,
-                    'size': lots,
-                    'duration': 0
-                }
-                in_position = True
-        
-        # Reset Range at end of session
-        if t >= TRADE_END:
-            range_set = False
-            
-        # Record Equity (Daily or Candle?) 
-        # For curve, candle is fine, but maybe too dense. Let's record daily closes? 
-        # Or just use the trade exit points for the curve.
-        # Let's record hourly equity?
-        # For now, we reconstruct curve from trades.
-        pass
+    (n_trades, entry_idx, exit_idx, directions, entry_px, exit_px,
+     sizes, pnls, reasons, equity_after, equity) = _simulate_njit(
+        highs, lows, closes, minutes, asian_highs, entry_mask, next_entry, len(df),
+        _pips_to_ticks(config['sl_pips']), _pips_to_ticks(config['tp_pips']),
+        _pips_to_ticks(config['trail_trigger']), _pips_to_ticks(config['trail_dist']),
+        float(equity), config['mode'] == 'fixed', float(config['fixed_lots']), float(config['risk_pct']),
+        TRADE_END_M,
+    )
+    
+    # Rebuild the trade log from the kernel's column arrays
+    trades = pd.DataFrame({
+        'entry_time': times[entry_idx[:n_trades]],
+        'exit_time': times[exit_idx[:n_trades]],
+        'type': np.where(directions[:n_trades] > 0, 'long', 'short'),
+        'entry_price': entry_px[:n_trades] / TICKS_PER_PRICE,
+        'exit_price': exit_px[:n_trades] / TICKS_PER_PRICE,
+        'size': sizes[:n_trades],
+        'pnl': pnls[:n_trades],
+        'reason': REASONS[reasons[:n_trades]],
+        'equity_after': equity_after[:n_trades],
+    })
 
-    return pd.DataFrame(trades), equity
+    return trades, equity
+
+@njit(cache=True)
+def _max_drawdown_njit(equity):
+    """
+    Single pass over the equity curve with a running peak.
+    Returns (max drawdown in $, max drawdown in %), both <= 0, without materializing
+    the peak / drawdown / drawdown-% series.
+    """
+    peak = equity[0]
+    max_dd_abs = 0.0
+    max_dd_pct = 0.0
+    for i in range(len(equity)):
+        value = equity[i]
+        if value > peak:
+            peak = value
+        dd = value - peak
+        if dd < max_dd_abs:
+            max_dd_abs = dd
+        dd_pct = (dd / peak) * 100
+        if dd_pct < max_dd_pct:
+            max_dd_pct = dd_pct
+    return max_dd_abs, max_dd_pct
+
+@njit(parallel=True, cache=True)
+def _sweep_njit(highs, lows, closes, minutes_of_day, asian_highs, entry_mask, next_entry, n,
+                sl_grid, tp_grid, trig_grid, dist_grid,
+                initial_equity, mode_is_fixed, fixed_lots, risk_pct, trade_end_m):
+    """
+    Runs _simulate_njit once per point of the sl x tp x trigger x dist grid (all in ticks),
+    spread over threads with prange. Returns per-config net PnL, max drawdown ($) and trade count.
+    """
+    n_tp = len(tp_grid)
+    n_trig = len(trig_grid)
+    n_dist = len(dist_grid)
+    n_cfg = len(sl_grid) * n_tp * n_trig * n_dist
+
+    net_pnl = np.empty(n_cfg, np.float64)
+    max_dd = np.empty(n_cfg, np.float64)
+    n_trades = np.empty(n_cfg, np.int64)
+
+    for k in prange(n_cfg):
+        # Flat index -> grid coordinates (dist varies fastest)
+        i_dist = k % n_dist
+        i_trig = (k // n_dist) % n_trig
+        i_tp = (k // (n_dist * n_trig)) % n_tp
+        i_sl = k // (n_dist * n_trig * n_tp)
+
+        result = _simulate_njit(
+            highs, lows, closes, minutes_of_day, asian_highs, entry_mask, next_entry, n,
+            sl_grid[i_sl], tp_grid[i_tp], trig_grid[i_trig], dist_grid[i_dist],
+            initial_equity, mode_is_fixed, fixed_lots, risk_pct, trade_end_m,
+        )
+        count = result[0]
+        net_pnl[k] = result[10] - initial_equity
+        n_trades[k] = count
+        max_dd[k] = _max_drawdown_njit(result[9][:count])[0] if count > 0 else 0.0
+
+    return net_pnl, max_dd, n_trades
+
+def run_sweep(df, config, sl_pips, tp_pips, trail_triggers, trail_dists):
+    """
+    Backtest every combination of the given SL / TP / trail-trigger / trail-dist values (pips)
+    with the sizing settings from config. Returns one row per combination.
+    """
+    grids = [np.array([_pips_to_ticks(p) for p in values], dtype=np.int64)
+             for values in (sl_pips, tp_pips, trail_triggers, trail_dists)]
+
+    logger.info(f"Sweeping {np.prod([len(g) for g in grids])} parameter combinations...")
+    net_pnl, max_dd, n_trades = _sweep_njit(
+        *_kernel_inputs(df), len(df), *grids,
+        float(config['initial_capital']), config['mode'] == 'fixed',
+        float(config['fixed_lots']), float(config['risk_pct']), TRADE_END_M,
+    )
+
+    combos = pd.MultiIndex.from_product(
+        [sl_pips, tp_pips, trail_triggers, trail_dists],
+        names=['sl_pips', 'tp_pips', 'trail_trigger', 'trail_dist'],
+    ).to_frame(index=False)
+    combos['net_pnl'] = net_pnl
+    combos['max_dd'] = max_dd
+    combos['n_trades'] = n_trades
+    return combos
 
 def generate_report(trades_df, initial_equity, final_equity):
     if trades_df.empty:
@@ -315,31 +534,29 @@ def generate_report(trades_df, initial_equity, final_equity):
 
     # Metrics
     total_trades = len(trades_df)
-    wins = trades_df[trades_df['pnl'] > 0]
-    losses = trades_df[trades_df['pnl'] <= 0]
+    # One mask over the raw pnl array instead of slicing the frame into wins / losses
+    pnl = trades_df['pnl'].to_numpy(np.float64)
+    win_mask = pnl > 0
     
-    n_wins = len(wins)
-    n_losses = len(losses)
+    n_wins = int(np.count_nonzero(win_mask))
+    n_losses = total_trades - n_wins
     win_rate = (n_wins / total_trades) * 100
     
-    gross_profit = wins['pnl'].sum() if n_wins > 0 else 0.0
-    gross_loss = abs(losses['pnl'].sum()) if n_losses > 0 else 0.0
+    gross_profit = float(np.where(win_mask, pnl, 0.0).sum())
+    losses_sum = float(np.where(win_mask, 0.0, pnl).sum())
+    gross_loss = abs(losses_sum)
     net_profit = gross_profit - gross_loss
     profit_factor = (gross_profit / gross_loss) if gross_loss > 0 else 999.0
     
-    avg_win = wins['pnl'].mean() if n_wins > 0 else 0.0
-    avg_loss = losses['pnl'].mean() if n_losses > 0 else 0.0
+    avg_win = gross_profit / n_wins if n_wins > 0 else 0.0
+    avg_loss = losses_sum / n_losses if n_losses > 0 else 0.0
     
     # Drawdown
     # Reconstruct equity curve
     trades_df['cum_pnl'] = trades_df['pnl'].cumsum()
     trades_df['equity'] = initial_equity + trades_df['cum_pnl']
     
-    peak = trades_df['equity'].cummax()
-    drawdown = trades_df['equity'] - peak
-    drawdown_pct = (drawdown / peak) * 100
-    max_dd_abs = drawdown.min()
-    max_dd_pct = drawdown_pct.min()
+    max_dd_abs, max_dd_pct = _max_drawdown_njit(trades_df['equity'].to_numpy(np.float64))
     
     # Daily Stats
     trades_df['date'] = pd.to_datetime(trades_df['exit_time']).dt.date
@@ -371,23 +588,31 @@ def generate_report(trades_df, initial_equity, final_equity):
     
     # Save CSVs
     trades_df.to_csv(OUTPUT_TRADES_PATH, index=False)
-    equity_df = trades_df[['exit_time', 'equity']].copy()
-    equity_df.to_csv(OUTPUT_EQUITY_PATH, index=False)
+    trades_df[['exit_time', 'equity']].to_csv(OUTPUT_EQUITY_PATH, index=False)
     
     # Plotting
+    fig = None
     try:
-        plt.figure(figsize=(10, 6))
-        plt.plot(pd.to_datetime(trades_df['exit_time']), trades_df['equity'], label='Equity')
-        plt.title('Account Equity Curve')
-        plt.xlabel('Date')
-        plt.ylabel('Balance ($)')
-        plt.grid(True, alpha=0.3)
-        plt.legend()
-        plt.savefig(OUTPUT_PLOT_PATH)
+        # ~2000 points are indistinguishable at this size; always keep the final balance
+        step = max(1, len(trades_df) // 2000)
+        plot_df = trades_df.iloc[np.unique(np.r_[0:len(trades_df):step, len(trades_df) - 1])]
+        
+        fig, ax = plt.subplots(figsize=(10, 6))
+        ax.plot(pd.to_datetime(plot_df['exit_time']), plot_df['equity'], label='Equity')
+        ax.set_title('Account Equity Curve')
+        ax.set_xlabel('Date')
+        ax.set_ylabel('Balance ($)')
+        ax.grid(True, alpha=0.3)
+        ax.legend()
+        fig.savefig(OUTPUT_PLOT_PATH)
         print(f"Metrics saved to {OUTPUT_TRADES_PATH}")
         print(f"Equity curve plot saved to {OUTPUT_PLOT_PATH}")
     except Exception as e:
         print(f"Could not generate plot: {e}")
+    finally:
+        # pyplot keeps every figure alive until closed; repeated reports would pile them up
+        if fig is not None:
+            plt.close(fig)
 
 if __name__ == "__main__":
     if not DATA_PATH.exists():
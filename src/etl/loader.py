@@ -1,5 +1,5 @@
+import functools
 import pandas as pd
-import pytz
 from datetime import datetime
 from abc import ABC, abstractmethod
 import logging
@@ -9,16 +9,47 @@ try:
 except ImportError:
     mt5 = None
 
+# Config timeframe name -> MT5 constant (empty without the MetaTrader5 package)
+TF_MAP = {
+    "M1": mt5.TIMEFRAME_M1, "M5": mt5.TIMEFRAME_M5, "M15": mt5.TIMEFRAME_M15,
+    "M30": mt5.TIMEFRAME_M30, "H1": mt5.TIMEFRAME_H1, "H4": mt5.TIMEFRAME_H4,
+    "D1": mt5.TIMEFRAME_D1
+} if mt5 is not None else {}
+
+try:
+    import pyarrow  # noqa: F401  (enables pandas' multithreaded C++ CSV reader)
+    CSV_ENGINE = 'pyarrow'
+except ImportError:
+    CSV_ENGINE = 'c'
+
 from src.config import config
 
 # Logging
 logger = logging.getLogger(__name__)
 
+# Legacy MT5 export layout: tab-separated, no header
+LEGACY_CSV_COLUMNS = ["time_str", "open", "high", "low", "close", "vol"]
+# Columns CSVLoader reads from headed files (matched case-insensitively)
+_CSV_TIME_COLUMNS = ("time_str", "date", "time")
+_CSV_PRICE_COLUMNS = ("open", "high", "low", "close")
+
+def _sniff_csv(path):
+    """Delimiter and first-line fields from the first 4 KB, so the file is only parsed once."""
+    with open(path, 'rb') as f:
+        head = f.read(4096)
+    first_line = head.split(b'\n', 1)[0].decode('utf-8', 'replace').strip()
+    delimiter = '\t' if '\t' in first_line else ','
+    return delimiter, first_line.split(delimiter)
+
 class DataLoader(ABC):
     @abstractmethod
     def fetch_data(self, symbol, timeframe_str, start_dt, end_dt):
         pass
 
+    def fetch_recent(self, symbol, timeframe_str, n):
+        """Last n bars, oldest first (the last one is still forming). Live sources only."""
+        raise NotImplementedError(f"{type(self).__name__} does not support recent-bar fetches")
+
 class MT5Loader(DataLoader):
     def __init__(self):
         self._connected = False
@@ -42,21 +73,31 @@ class MT5Loader(DataLoader):
             self._connected = False
             logger.info("MT5 connection closed.")
 
-    def fetch_data(self, symbol, timeframe_str, start_dt, end_dt):
+    def _ensure_connected(self):
         if not self._connected:
             if not self.initialize():
                  raise ConnectionError("Could not connect to MT5")
 
-        # Map timeframe string to MT5 constant
-        tf_map = {
-            "M1": mt5.TIMEFRAME_M1, "M5": mt5.TIMEFRAME_M5, "M15": mt5.TIMEFRAME_M15,
-            "M30": mt5.TIMEFRAME_M30, "H1": mt5.TIMEFRAME_H1, "H4": mt5.TIMEFRAME_H4,
-            "D1": mt5.TIMEFRAME_D1
-        }
-        
-        tf = tf_map.get(timeframe_str)
-        if not tf:
-             raise ValueError(f"Unsupported timeframe: {timeframe_str}")
+    @staticmethod
+    def _timeframe(timeframe_str):
+        """Map timeframe string to MT5 constant."""
+        try:
+            return TF_MAP[timeframe_str]
+        except KeyError:
+            raise ValueError(f"Unsupported timeframe: {timeframe_str}") from None
+
+    def fetch_recent(self, symbol, timeframe_str, n):
+        """
+        Last n bars by position (no date-range scan on the terminal side), returned as
+        MT5's raw structured array so per-tick callers skip DataFrame construction.
+        None if MT5 returned nothing.
+        """
+        self._ensure_connected()
+        return mt5.copy_rates_from_pos(symbol, self._timeframe(timeframe_str), 0, n)
+
+    def fetch_data(self, symbol, timeframe_str, start_dt, end_dt):
+        self._ensure_connected()
+        tf = self._timeframe(timeframe_str)
 
         # Ensure datetimes are timezone-aware or handle accordingly
         # MT5 usually expects UTC or server time. Let's assume standard datetime objects.
@@ -66,14 +107,17 @@ class MT5Loader(DataLoader):
             logger.warning("No data received from MT5")
             return pd.DataFrame()
 
-        df = pd.DataFrame(rates)
-        df['time'] = pd.to_datetime(df['time'], unit='s')
-        
-        # Rename columns to standard
+        # Build straight from the structured array's fields, renamed to standard
         # MT5 returns: time, open, high, low, close, tick_volume, spread, real_volume
-        df.rename(columns={'tick_volume': 'vol'}, inplace=True)
-        
-        return df[['time', 'open', 'high', 'low', 'close', 'vol']]
+        # Epoch seconds -> datetime64 as a plain cast (skips to_datetime's unit parsing)
+        return pd.DataFrame({
+            'time': rates['time'].astype('int64', copy=False).view('datetime64[s]').astype('datetime64[ns]'),
+            'open': rates['open'],
+            'high': rates['high'],
+            'low': rates['low'],
+            'close': rates['close'],
+            'vol': rates['tick_volume'],
+        }, copy=False)
 
 class CSVLoader(DataLoader):
     def __init__(self, file_path):
@@ -84,53 +128,61 @@ class CSVLoader(DataLoader):
             raise FileNotFoundError(f"CSV Data file not found: {self.file_path}")
 
         logger.info(f"Loading data from CSV: {self.file_path}")
-        # Assuming flexible CSV reading, but optimized for the user's previous format
-        # Format from original run_gold_breakout.py: tab-separated, no header? 
-        # Or maybe standard CSV. Let's try to detect or support the format from original script.
-        # Original: sep='\t', names=["time_str", "open", "high", "low", "close", "vol"]
+        # Two layouts are supported:
+        # Legacy (original run_gold_breakout.py): tab-separated, no header, LEGACY_CSV_COLUMNS
+        # Standard: comma-separated with a header row
+        delimiter, first_fields = _sniff_csv(self.file_path)
         
-        try:
-            # Try reading as tab separated first (legacy support)
-            df = pd.read_csv(self.file_path, sep='\t', header=None, 
-                             names=["time_str", "open", "high", "low", "close", "vol"])
-            if df.shape[1] == 1: # Failed to parse tabs correctly, maybe it is comma
-                 df = pd.read_csv(self.file_path) # Auto-detect
-        except Exception:
-             # Fallback to standard read
-             df = pd.read_csv(self.file_path)
+        if delimiter == '\t':
+            df = pd.read_csv(self.file_path, sep='\t', header=None, names=LEGACY_CSV_COLUMNS,
+                             dtype={c: 'float64' for c in _CSV_PRICE_COLUMNS},
+                             engine=CSV_ENGINE)
+        else:
+            # Only the columns used below, with the price dtypes declared up front
+            wanted = set(_CSV_TIME_COLUMNS + _CSV_PRICE_COLUMNS + ('vol',))
+            # Header names we can't match (e.g. quoted) fall back to reading every column
+            usecols = [c for c in first_fields if c.strip().lower() in wanted] or None
+            price_dtypes = {c: 'float64' for c in first_fields if c.strip().lower() in _CSV_PRICE_COLUMNS}
+            df = pd.read_csv(self.file_path, usecols=usecols, dtype=price_dtypes, engine=CSV_ENGINE)
 
         # Standardize columns
-        df.columns = [c.lower() for c in df.columns]
+        df.columns = [c.strip().lower() for c in df.columns]
+        # Name -> position once, so every presence check below is a dict lookup
+        col_idx = {c: i for i, c in enumerate(df.columns)}
+        
+        # Handle Time: first of time_str / date / time that is present
+        time_col = next((c for c in _CSV_TIME_COLUMNS if c in col_idx), None)
+        if time_col is None:
+            raise ValueError("CSV missing required column: time")
+        df['time'] = pd.to_datetime(df[time_col])
         
-        # Handle Time
-        if 'time_str' in df.columns:
-            df['time'] = pd.to_datetime(df['time_str'])
-        elif 'date' in df.columns:
-            df['time'] = pd.to_datetime(df['date'])
-        elif 'time' in df.columns:
-            df['time'] = pd.to_datetime(df['time'])
+        # Ensure required columns
+        req_cols = ['time', *_CSV_PRICE_COLUMNS]
+        for c in _CSV_PRICE_COLUMNS:
+            if c not in col_idx:
+                raise ValueError(f"CSV missing required column: {c}")
             
-        # Filter range
+        # Filter range: Timestamp() for the scalar bounds, one combined mask, one copy
+        in_range = None
         if start_dt:
-             df = df[df['time'] >= pd.to_datetime(start_dt)]
+             in_range = df['time'] >= pd.Timestamp(start_dt)
         if end_dt:
-             df = df[df['time'] <= pd.to_datetime(end_dt)]
+             before_end = df['time'] <= pd.Timestamp(end_dt)
+             in_range = before_end if in_range is None else in_range & before_end
+        if in_range is not None:
+             df = df[in_range]
              
         df = df.sort_values('time').reset_index(drop=True)
-        
-        # Ensure required columns
-        req_cols = ['time', 'open', 'high', 'low', 'close']
-        for c in req_cols:
-            if c not in df.columns:
-                raise ValueError(f"CSV missing required column: {c}")
                 
         # Optional vol
-        if 'vol' not in df.columns:
+        if 'vol' not in col_idx:
             df['vol'] = 0
             
         return df[req_cols + ['vol']]
 
+@functools.lru_cache(maxsize=1)
 def get_data_loader():
+    """Return the configured loader; cached so the (connection-holding) instance is reused."""
     method = config.get("DATALOADING", "LIVE")
     if method in ["LIVE", "HISTORY"]:
         return MT5Loader()
@@ -1,11 +1,22 @@
+import copy
+import json
 import yaml
-import pytz
-from datetime import datetime, time
+from datetime import datetime, time, timezone
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 from pathlib import Path
 import logging
 
+# Prefer the libyaml-backed C loader; fall back to the pure-Python one
+try:
+    from yaml import CSafeLoader as _Loader
+except ImportError:
+    from yaml import SafeLoader as _Loader
+
 logger = logging.getLogger(__name__)
 
+# Parsed YAML keyed by path -> (mtime_ns, data), so reloads of an unchanged file skip parsing
+_PARSED_CACHE = {}
+
 class Config:
     def __init__(self, config_path="config.yaml"):
         # Look for config in root
@@ -24,26 +35,33 @@ class Config:
             # Try to load json if yaml missing (migration support)
             json_path = self.config_path.with_suffix('.json')
             if json_path.exists():
-                 import json
                  with open(json_path, 'r') as f:
-                     return json.load(f)
+                     return json.loads(f.read())
             raise FileNotFoundError(f"Config file not found: {self.config_path}")
         
-        with open(self.config_path, 'r') as f:
-            return yaml.safe_load(f)
+        mtime_ns = self.config_path.stat().st_mtime_ns
+        cached = _PARSED_CACHE.get(self.config_path)
+        if cached is None or cached[0] != mtime_ns:
+            with open(self.config_path, 'r') as f:
+                cached = (mtime_ns, yaml.load(f, Loader=_Loader))
+            _PARSED_CACHE[self.config_path] = cached
+
+        # Hand out a copy so set() on one instance never leaks into the cache
+        return copy.deepcopy(cached[1])
 
     def _setup_timezones(self):
         tz_conf = self.get("TIMEZONE", {})
         self.broker_tz_name = tz_conf.get("BROKER", "Europe/Athens")
         self.user_tz_name = tz_conf.get("USER", "Asia/Kolkata")
         
+        # ZoneInfo instances are cached by key, so reloads reuse the same objects
         try:
-            self.broker_tz = pytz.timezone(self.broker_tz_name)
-            self.user_tz = pytz.timezone(self.user_tz_name)
-        except pytz.UnknownTimeZoneError as e:
+            self.broker_tz = ZoneInfo(self.broker_tz_name)
+            self.user_tz = ZoneInfo(self.user_tz_name)
+        except (ZoneInfoNotFoundError, ValueError) as e:
             logger.error(f"Invalid timezone: {e}")
-            self.broker_tz = pytz.utc
-            self.user_tz = pytz.utc
+            self.broker_tz = timezone.utc
+            self.user_tz = timezone.utc
 
     def get(self, key, default=None):
         return self.data.get(key, default)
@@ -71,7 +89,7 @@ class Config:
         elif isinstance(user_time_obj, datetime):
             dt = user_time_obj
             if dt.tzinfo is None:
-                dt = self.user_tz.localize(dt)
+                dt = dt.replace(tzinfo=self.user_tz)
         else:
             return user_time_obj
 
@@ -81,6 +99,19 @@ class Config:
             return broker_dt.time()
         return broker_dt
 
+    def convert_series_to_broker_time(self, series):
+        """
+        Vectorized convert_to_broker_time for a datetime Series (e.g. a replayed history).
+        Naive values are taken as user time; wall times skipped by a DST jump shift forward.
+        """
+        # Only this helper needs pandas; keep it off the import path of every config user
+        import pandas as pd
+
+        times = pd.DatetimeIndex(series)
+        if times.tz is None:
+            times = times.tz_localize(self.user_tz, ambiguous=False, nonexistent='shift_forward')
+        return pd.Series(times.tz_convert(self.broker_tz), index=series.index, name=series.name)
+
 # Global config instance
 try:
     config = Config()
@@ -1,9 +1,11 @@
 import time
 import logging
-import pytz
 from datetime import datetime, timedelta, time as dtime
+from zoneinfo import ZoneInfo
 import pandas as pd
 from src.config import config
+from src.etl.loader import TF_MAP
+from src.strategies.base import Candle
 
 try:
     import MetaTrader5 as mt5
@@ -12,13 +14,21 @@ except ImportError:
 
 logger = logging.getLogger(__name__)
 
+HEARTBEAT_SECONDS = 15
+# Bar length per timeframe, used to sleep until the next candle can have closed
+_TF_SECONDS = {"M1": 60, "M5": 300, "M15": 900, "M30": 1800, "H1": 3600, "H4": 14400, "D1": 86400}
+# Grace after a bar boundary before asking MT5 for the closed candle
+_CANDLE_GRACE_SECONDS = 0.5
+
 class LiveTrader:
     def __init__(self, strategy_cls, data_loader):
         self.strategy = strategy_cls(config)
         self.loader = data_loader
         self.symbol = "XAUUSD" # Configurable?
         self.timeframe_str = config.get("TIMEFRAME", "M15")
-        self.user_tz = pytz.timezone(config.get("TIMEZONE", {}).get("USER", "Asia/Kolkata"))
+        self.user_tz = ZoneInfo(config.get("TIMEZONE", {}).get("USER", "Asia/Kolkata"))
+        # Resolved once; the live loop checks this every second
+        self.direct_mt5 = config.get("DATALOADING") in ("LIVE", "HISTORY")
         
     def run(self):
         logger.info("Starting Live Trader...")
@@ -37,10 +47,31 @@ class LiveTrader:
         logger.info("Live loop running... (Ctrl+C to stop)")
         try:
             last_candle_time = None
+            # Resolved once for the loop; unknown names fall back to M15
+            timeframe_str = self.timeframe_str if self.timeframe_str in TF_MAP else "M15"
+            period = _TF_SECONDS[timeframe_str]
+            
+            # Deadlines instead of a 1s busy-poll: wake for the next heartbeat or the
+            # next bar close, whichever comes first
+            next_poll = time.time()
+            next_heartbeat = next_poll + HEARTBEAT_SECONDS
             
             while True:
-                # Sleep to avoid hammering CPU
-                time.sleep(1) 
+                time.sleep(max(0.0, min(next_poll, next_heartbeat) - time.time()))
+                now = time.time()
+                
+                # --- Heartbeat / Price Log (Every ~15 seconds) ---
+                if now >= next_heartbeat:
+                     next_heartbeat = now + HEARTBEAT_SECONDS
+                     if mt5:
+                         tick = mt5.symbol_info_tick(self.symbol)
+                         if tick:
+                            logger.info(f"[{self.symbol}] Current Price: {tick.bid} / {tick.ask}")
+                
+                if now < next_poll:
+                    continue
+                # Until a new candle shows up, keep checking once per second
+                next_poll = now + 1
                 
                 # Check for new candle
                 # Logic: Get last completed candle. 
@@ -50,55 +81,45 @@ class LiveTrader:
                 # We want the latest CLOSED candle.
                 # MT5 copy_rates_from_pos(..., 2) -> returns current (forming) and previous (closed)
                 
-                # Using loader's generic interface is harder for "last 2 candles" without overhead.
-                # Let's use direct MT5 calls if loader allows, or just fetch small time range.
-                
-                # Optimization: MT5 specific
-                if config.get("DATALOADING") in ["LIVE", "HISTORY"]: 
-                    # Direct efficient call
-                    # copy_rates_from_pos(symbol, timeframe, start_pos, count)
-                    # pos 0 is current, pos 1 is last closed
+                # Only MT5 loaders serve recent bars (fetch_recent); CSV sources have no live tail.
+                if self.direct_mt5:
+                    # Position-based fetch: pos 0 is current, pos 1 is last closed
                     if not mt5: break 
                     
-                    tf_map = {
-                        "M1": mt5.TIMEFRAME_M1, "M15": mt5.TIMEFRAME_M15, "H1": mt5.TIMEFRAME_H1
-                    }
-                    tf = tf_map.get(self.timeframe_str, mt5.TIMEFRAME_M15)
-                    
                     # Fetch last 2 candles
-                    rates = mt5.copy_rates_from_pos(self.symbol, tf, 0, 2)
-                    if rates is None: continue
-                    
-                    # Convert to DataFrame
-                    df = pd.DataFrame(rates)
-                    df['time'] = pd.to_datetime(df['time'], unit='s')
+                    rates = self.loader.fetch_recent(self.symbol, timeframe_str, 2)
+                    if rates is None or len(rates) < 2: continue
                     
                     # The candle at index 0 (if len=2) is the previous closed one [0, 1] -> 0 is older?
                     # copy_rates_from_pos: "The elements are ordered from the past to the present"
                     # So rates[-1] is current (forming), rates[-2] is last closed.
-                    last_closed = df.iloc[-2]
+                    # Read it straight off the structured array: no DataFrame for a single row
+                    last_closed = rates[-2]
                     
-                    ts = last_closed['time']
+                    ts = pd.Timestamp(int(last_closed['time']), unit='s')
                     
                     if last_candle_time is None or ts > last_candle_time:
                         logger.info(f"New Candle Detected: {ts}")
                         last_candle_time = ts
+                        # Nothing new can close before the next bar boundary
+                        next_poll = (now // period + 1) * period + _CANDLE_GRACE_SECONDS
                         
                         # Process Candle
                         # Standardize format
                         # We need 'open', 'high', 'low', 'close', 'time'
-                        # MT5 DF has lowercase cols usually.
-                        candle_data = {
-                            'time': ts, # This is usually UTC or Server Time.
+                        # MT5 rates have lowercase fields; volume is 'tick_volume'.
+                        candle_data = Candle(
+                            time=ts, # This is usually UTC or Server Time.
                             # We might need to convert this 'time' to User/Broker correct TZ 
                             # if the strategy expects 'time' column to be timezone aware?
-                            # The strategy uses .dt.time() on it. 
+                            # The strategy uses .time() on it. 
                             # Our loader usually converts.
-                            'open': last_closed['open'],
-                            'high': last_closed['high'],
-                            'low': last_closed['low'],
-                            'close': last_closed['close']
-                        }
+                            open=float(last_closed['open']),
+                            high=float(last_closed['high']),
+                            low=float(last_closed['low']),
+                            close=float(last_closed['close']),
+                            vol=int(last_closed['tick_volume']),
+                        )
                         
                         # Log Current Price periodically (e.g. every 10s) to show life
                         # Timestamp of 'ts' is when candle closed. 
@@ -123,17 +144,11 @@ class LiveTrader:
                 else:
                     pass
 
-                # --- Heartbeat / Price Log (Every ~15 seconds) ---
-                if int(time.time()) % 15 == 0:
-                     if mt5:
-                         tick = mt5.symbol_info_tick(self.symbol)
-                         if tick:
-                            logger.info(f"[{self.symbol}] Current Price: {tick.bid} / {tick.ask}")
-
 
         except KeyboardInterrupt:
             logger.info("Stopping Live Trader...")
         finally:
+            self.strategy.flush_state()
             self.loader.shutdown()
 
     def sync_state(self):
@@ -158,10 +173,8 @@ class LiveTrader:
             return
 
         logger.info(f"Replaying {len(df)} candles...")
-        records = df.to_dict('records')
-        for candle in records:
-            # We don't execute orders during replay, just update state
-            self.strategy.next(candle)  
+        # We don't execute orders during replay, just update state
+        self.strategy.replay(df)
             
         # Sync complete
         state = self.strategy.get_additional_state()
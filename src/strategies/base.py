@@ -1,19 +1,63 @@
 from abc import ABC, abstractmethod
+from collections import namedtuple
+import json
 import logging
+import math
+import os
+import pickle
+import queue
+import threading
 from pathlib import Path
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# One bar as passed to Strategy.next()
+Candle = namedtuple('Candle', 'time open high low close vol')
 
 class Strategy(ABC):
+    # Slots keep per-candle attribute access off an instance dict; subclasses declare their own
+    __slots__ = ('config', 'orders', 'position', 'equity', 'logger', 'state_file',
+                 '_saved_state', 'persist_state', '_state_queue')
+
     def __init__(self, config):
         self.config = config
         self.orders = []
         self.position = None # Current open position
         self.equity = config.get("initial_capital", 10000.0) # Tracked by engine usually, but local ref useful
         self.logger = logging.getLogger(self.__class__.__name__)
-        self.state_file = Path(config.get("PATHS", {}).get("STATE_FILE", "trade_state.pkl"))
+        self.state_file = Path(config.get("PATHS", {}).get("STATE_FILE", "trade_state.json"))
+        self._saved_state = None # Last bytes written, to skip rewriting an unchanged state
+        # Backtests rebuild everything from data, so only live runs persist state
+        self.persist_state = str(config.get("MODE", "LIVE")).upper() != "BACKTESTING"
+        self._state_queue = None # Writer thread's inbox, created on the first save
+
+    @staticmethod
+    def _dump_state(state):
+        """Serialize state to JSON bytes (orjson when installed; non-finite floats become null)."""
+        if orjson is not None:
+            return orjson.dumps(state, option=orjson.OPT_SERIALIZE_NUMPY)
+        # Match orjson: no Infinity/NaN literals in the file
+        state = {k: None if isinstance(v, float) and not math.isfinite(v) else v for k, v in state.items()}
+        return json.dumps(state).encode()
+
+    @staticmethod
+    def _parse_state(data):
+        """Inverse of _dump_state; state files written by older versions are pickles."""
+        if data[:1] == b'\x80': # Pickle protocol 2+ header
+            return pickle.loads(data)
+        if orjson is not None:
+            return orjson.loads(data)
+        return json.loads(data)
 
     def save_state(self):
-        """Save critical state to file."""
-        import pickle
+        """
+        Save critical state to file. The state is serialized here, but the write happens
+        on a background thread so next() never blocks on disk; see flush_state().
+        """
+        if not self.persist_state:
+            return
         state = {
             'orders': self.orders,
             'position': self.position,
@@ -23,20 +67,61 @@ class Strategy(ABC):
         state.update(self.get_additional_state())
         
         try:
-            with open(self.state_file, 'wb') as f:
-                pickle.dump(state, f)
+            data = self._dump_state(state)
         except Exception as e:
             self.logger.error(f"Failed to save state: {e}")
+            return
+        if data == self._saved_state:
+            return
+        self._saved_state = data
+
+        if self._state_queue is None:
+            self._state_queue = queue.Queue()
+            threading.Thread(target=self._state_writer, name=f"{self.__class__.__name__}-state", daemon=True).start()
+        self._state_queue.put(data)
+
+    def _state_writer(self):
+        """Writer thread: persists the newest queued state, skipping any it superseded."""
+        state_queue = self._state_queue
+        while True:
+            data = state_queue.get()
+            taken = 1
+            while True:
+                try:
+                    data = state_queue.get_nowait()
+                except queue.Empty:
+                    break
+                taken += 1
+
+            try:
+                # Write aside and swap in, so a crash mid-write never leaves a torn state file
+                tmp_path = self.state_file.with_name(self.state_file.name + '.tmp')
+                with open(tmp_path, 'wb') as f:
+                    f.write(data)
+                os.replace(tmp_path, self.state_file)
+            except Exception as e:
+                self._saved_state = None # Let the next save retry even if unchanged
+                self.logger.error(f"Failed to save state: {e}")
+            finally:
+                for _ in range(taken):
+                    state_queue.task_done()
+
+    def flush_state(self):
+        """Block until every queued state write has reached disk."""
+        if self._state_queue is not None:
+            self._state_queue.join()
 
     def load_state(self):
-        """Load state from file."""
-        import pickle
-        if not self.state_file.exists():
-            return False
+        """Load state from file (or from its older pickled .pkl sibling, which the next save replaces)."""
+        state_file = self.state_file
+        if not state_file.exists():
+            state_file = state_file.with_suffix('.pkl')
+            if state_file == self.state_file or not state_file.exists():
+                return False
             
         try:
-            with open(self.state_file, 'rb') as f:
-                state = pickle.load(f)
+            with open(state_file, 'rb') as f:
+                state = self._parse_state(f.read())
             
             self.orders = state.get('orders', [])
             self.position = state.get('position')
@@ -63,8 +148,24 @@ class Strategy(ABC):
 
     @abstractmethod
     def next(self, candle):
-        """Called for every new candle."""
+        """Called for every new candle (a Candle)."""
         pass
+
+    def replay(self, df):
+        """
+        Rebuild state from historical candles; signals are discarded.
+        Strategies that can run the whole history as one compiled pass
+        implement _replay_njit(df), otherwise every candle goes through next().
+        """
+        replay_njit = getattr(self, '_replay_njit', None)
+        if replay_njit is not None:
+            replay_njit(df)
+            return
+
+        # Stream rows instead of materializing every record up front; itertuples keeps
+        # Timestamps (not raw datetime64) so next() sees the same values as live candles
+        for row in df[list(Candle._fields)].itertuples(index=False, name=None):
+            self.next(Candle._make(row))
         
     def signal_entry(self, direction, price, sl, tp, comment=""):
         """
@@ -1,8 +1,231 @@
+import numpy as np
+import pandas as pd
 from src.strategies.base import Strategy
 from src.production.config import config as global_config
 from datetime import datetime, time
+from functools import lru_cache
+
+try:
+    from numba import njit, prange
+except ImportError:
+    # Numba is optional: without it the replay kernel runs as plain Python
+    def njit(*args, **kwargs):
+        if len(args) == 1 and callable(args[0]):
+            return args[0]
+        return lambda fn: fn
+    prange = range
+
+@lru_cache(maxsize=32)
+def _parse_time(time_str):
+    """Parse "HH:MM" into a time (immutable, so one shared instance per string)."""
+    h, m = map(int, time_str.split(':'))
+    return time(h, m)
+
+@lru_cache(maxsize=128)
+def _convert_cached(time_str, user_tz_name, broker_tz_name, day):
+    """
+    Broker-time equivalent of user-time "HH:MM" on `day`. The zone names and date are part of
+    the key because a config reload or a DST change moves the offset.
+    """
+    return global_config.convert_to_broker_time(datetime.combine(day, _parse_time(time_str))).time()
+
+def _minute_of_day(dt):
+    return dt.hour * 60 + dt.minute
+
+@njit(cache=True)
+def _in_session(s, start, end):
+    """Whether minute-of-day s is within [start, end), handling midnight crossover."""
+    if start < end:
+        return start <= s < end
+    # Midnight crossover (e.g. 23:00 to 02:00)
+    return s >= start or s < end
+
+def _session_mask(minutes, start, end):
+    """Array version of _in_session."""
+    if start < end:
+        return (minutes >= start) & (minutes < end)
+    return (minutes >= start) | (minutes < end)
+
+# _next_kernel signal codes
+SIGNAL_NONE = 0
+SIGNAL_LONG = 1
+SIGNAL_SHORT = 2
+SIGNAL_EXIT = 3
+
+# _next_kernel state layout (float64 array)
+STATE_ASIAN_HIGH = 0
+STATE_ASIAN_LOW = 1
+STATE_RANGE_SET = 2
+STATE_HAS_POSITION = 3
+STATE_SIZE = 4
+
+@njit(cache=True)
+def _next_kernel(minute, high, low, close, state, asian_start, asian_end, trade_end, sl_dist, tp_dist):
+    """
+    GoldBreakout.next for one candle, on a state array (STATE_* layout) updated in place.
+    Like next(), it never opens or closes the position itself.
+    Returns (signal, entry, sl, tp) with a SIGNAL_* code; prices are NaN where unused.
+    """
+    is_asian = _in_session(minute, asian_start, asian_end)
+    is_trade = _in_session(minute, asian_end, trade_end)
+    has_position = state[STATE_HAS_POSITION] != 0.0
+
+    if is_asian:
+        if high > state[STATE_ASIAN_HIGH]:
+            state[STATE_ASIAN_HIGH] = high
+        if low < state[STATE_ASIAN_LOW]:
+            state[STATE_ASIAN_LOW] = low
+        state[STATE_RANGE_SET] = 1.0
+
+    if not is_asian and not is_trade and not has_position:
+        state[STATE_ASIAN_HIGH] = -1.0
+        state[STATE_ASIAN_LOW] = np.inf
+        state[STATE_RANGE_SET] = 0.0
+
+    if not has_position and is_trade and state[STATE_RANGE_SET] != 0.0:
+        if close > state[STATE_ASIAN_HIGH]:
+            return SIGNAL_LONG, close, close - sl_dist, close + tp_dist
+        if close < state[STATE_ASIAN_LOW]:
+            return SIGNAL_SHORT, close, close + sl_dist, close - tp_dist
+
+    if has_position and not is_trade:
+        return SIGNAL_EXIT, close, np.nan, np.nan
+    return SIGNAL_NONE, np.nan, np.nan, np.nan
+
+# Session bucket bits in GoldBreakout._session_lut; both are set where the windows overlap
+SESSION_ASIAN = 1
+SESSION_TRADE = 2
+
+def _session_buckets(asian_start, asian_end, trade_end):
+    """1440-entry minute-of-day -> SESSION_* bits table, as bytes so indexing gives plain ints."""
+    minutes = np.arange(24 * 60)
+    lut = (np.where(_session_mask(minutes, asian_start, asian_end), SESSION_ASIAN, 0)
+           | np.where(_session_mask(minutes, asian_end, trade_end), SESSION_TRADE, 0))
+    return lut.astype(np.uint8).tobytes()
+
+@njit(cache=True)
+def _replay_range(minutes_of_day, highs, lows, closes, state, asian_start, asian_end, trade_end):
+    """Run _next_kernel over a whole history, discarding signals; the final state is left in `state`."""
+    for i in range(len(minutes_of_day)):
+        _next_kernel(minutes_of_day[i], highs[i], lows[i], closes[i], state,
+                     asian_start, asian_end, trade_end, 0.0, 0.0)
+
+# backtest_all exit reason codes index into this
+EXIT_REASONS = np.array(["SL", "TP", "Session Close"])
+
+@njit(cache=True)
+def _backtest_day(start, stop, minutes_of_day, highs, lows, closes, state, open_i, sl, tp,
+                  asian_start, asian_end, trade_end, sl_dist, tp_dist,
+                  direction, exit_idx, exit_px, reason):
+    """
+    backtest_all's trade loop over candles [start, stop), from `state` (updated in place)
+    and the open trade (open_i, -1 = flat, with its sl/tp). Returns the final (open_i, sl, tp).
+    """
+    for i in range(start, stop):
+        if open_i >= 0:
+            side = direction[open_i]
+            adverse = lows[i] if side > 0 else highs[i]
+            favourable = highs[i] if side > 0 else lows[i]
+            if side * (sl - adverse) >= 0:
+                exit_idx[open_i] = i
+                exit_px[open_i] = sl
+                reason[open_i] = 0
+                open_i = -1
+            elif side * (favourable - tp) >= 0:
+                exit_idx[open_i] = i
+                exit_px[open_i] = tp
+                reason[open_i] = 1
+                open_i = -1
+
+        state[STATE_HAS_POSITION] = 1.0 if open_i >= 0 else 0.0
+        signal, price, signal_sl, signal_tp = _next_kernel(
+            minutes_of_day[i], highs[i], lows[i], closes[i], state,
+            asian_start, asian_end, trade_end, sl_dist, tp_dist)
+
+        if signal == SIGNAL_EXIT:
+            exit_idx[open_i] = i
+            exit_px[open_i] = price
+            reason[open_i] = 2
+            open_i = -1
+        elif signal == SIGNAL_LONG or signal == SIGNAL_SHORT:
+            open_i = i
+            direction[i] = 1 if signal == SIGNAL_LONG else -1
+            sl = signal_sl
+            tp = signal_tp
+    return open_i, sl, tp
+
+@njit(parallel=True, cache=True)
+def backtest_all(minutes_of_day, highs, lows, closes, day_starts,
+                 asian_start, asian_end, trade_end, sl_dist, tp_dist):
+    """
+    Trade simulation of GoldBreakout over a whole history, one prange iteration per day.
+    day_starts holds the first candle index of each day plus len(closes). Every day is
+    first run flat with no range; a day whose predecessor did not end that way (a data gap
+    over the off-session candles that reset the range, or a trade still open) is then rerun
+    in order from the real carried state, so the result matches one sequential run.
+    Entries come from _next_kernel; SL is checked before TP against the candle's extremes,
+    then the session-close exit.
+    Returns per-entry-candle arrays: direction (+1/-1, 0 = no entry), exit index
+    (-1 = still open at the end of the data), exit price and EXIT_REASONS code.
+    """
+    n = len(closes)
+    n_days = len(day_starts) - 1
+    direction = np.zeros(n, np.int8)
+    exit_idx = np.full(n, -1, np.int64)
+    exit_px = np.full(n, np.nan)
+    reason = np.full(n, -1, np.int8)
+    end_state = np.empty((n_days, STATE_SIZE), np.float64)
+    end_open = np.empty(n_days, np.int64)
+    end_sl = np.empty(n_days, np.float64)
+    end_tp = np.empty(n_days, np.float64)
+
+    # Days write disjoint entry slots, so the threads never touch the same element
+    for d in prange(n_days):
+        state = np.empty(STATE_SIZE, np.float64)
+        state[STATE_ASIAN_HIGH] = -1.0
+        state[STATE_ASIAN_LOW] = np.inf
+        state[STATE_RANGE_SET] = 0.0
+        open_i, sl, tp = _backtest_day(
+            day_starts[d], day_starts[d + 1], minutes_of_day, highs, lows, closes,
+            state, -1, 0.0, 0.0, asian_start, asian_end, trade_end, sl_dist, tp_dist,
+            direction, exit_idx, exit_px, reason)
+        end_state[d] = state
+        end_open[d] = open_i
+        end_sl[d] = sl
+        end_tp[d] = tp
+
+    for d in range(1, n_days):
+        prev = end_state[d - 1]
+        if (end_open[d - 1] < 0 and prev[STATE_RANGE_SET] == 0.0
+                and prev[STATE_ASIAN_HIGH] == -1.0 and prev[STATE_ASIAN_LOW] == np.inf):
+            continue
+        start = day_starts[d]
+        stop = day_starts[d + 1]
+        direction[start:stop] = 0
+        exit_idx[start:stop] = -1
+        exit_px[start:stop] = np.nan
+        reason[start:stop] = -1
+        state = prev.copy()
+        open_i, sl, tp = _backtest_day(
+            start, stop, minutes_of_day, highs, lows, closes,
+            state, end_open[d - 1], end_sl[d - 1], end_tp[d - 1],
+            asian_start, asian_end, trade_end, sl_dist, tp_dist,
+            direction, exit_idx, exit_px, reason)
+        end_state[d] = state
+        end_open[d] = open_i
+        end_sl[d] = sl
+        end_tp[d] = tp
+
+    return direction, exit_idx, exit_px, reason
 
 class GoldBreakout(Strategy):
+    __slots__ = ('asian_start', 'asian_end', 'trade_end',
+                 'asian_start_min', 'asian_end_min', 'trade_end_min', '_session_lut',
+                 'tp_pips', 'sl_pips', 'PIP_VAL', 'sl_dist_price', 'tp_dist_price',
+                 'asian_high', 'asian_low', 'range_set')
+
+    _parse_time = staticmethod(_parse_time)
+
     def on_init(self):
         # 1. Load Session Times from YAML
         sessions = self.config.get("TRADING_SESSION", {})
@@ -11,6 +234,12 @@ class GoldBreakout(Strategy):
         self.asian_start = self._parse_and_convert(sessions.get("ASIAN_START", "03:30"))
         self.asian_end = self._parse_and_convert(sessions.get("ASIAN_END", "13:30"))
         self.trade_end = self._parse_and_convert(sessions.get("TRADE_END", "21:30"))
+        # Minute-of-day ints for the per-candle session checks
+        self.asian_start_min = _minute_of_day(self.asian_start)
+        self.asian_end_min = _minute_of_day(self.asian_end)
+        self.trade_end_min = _minute_of_day(self.trade_end)
+        # Session bucket of every minute of the day, so next() does one lookup per candle
+        self._session_lut = _session_buckets(self.asian_start_min, self.asian_end_min, self.trade_end_min)
         
         # 2. Strategy Params
         params = self.config.get("STRATEGY_PARAMS", {})
@@ -18,6 +247,9 @@ class GoldBreakout(Strategy):
         self.sl_pips = params.get("SL_PIPS", 100)
         
         self.PIP_VAL = 0.10
+        # Fixed SL/TP distances in price, so next() doesn't redo the pip conversion per candle
+        self.sl_dist_price = self.sl_pips * self.PIP_VAL
+        self.tp_dist_price = self.tp_pips * self.PIP_VAL
         
         # 3. State
         self.asian_high = -1.0
@@ -32,67 +264,63 @@ class GoldBreakout(Strategy):
 
     def _parse_and_convert(self, time_str):
         """Parse string "HH:MM" (User TZ) and convert to Broker TZ."""
-        h, m = map(int, time_str.split(':'))
-        t = time(h, m)
-        
         # If global config available, convert. Else raw time.
         if global_config:
-            return global_config.convert_to_broker_time(t)
-        return t
-
-    def is_session_active(self, current_time, start_time, end_time):
-        """Check if current_time is within [start_time, end_time), handling midnight crossover."""
-        if start_time < end_time:
-            return start_time <= current_time < end_time
-        else:
-            # Midnight crossover (e.g. 23:00 to 02:00)
-            return current_time >= start_time or current_time < end_time
+            today = datetime.now(global_config.user_tz).date()
+            return _convert_cached(time_str, global_config.user_tz_name, global_config.broker_tz_name, today)
+        return self._parse_time(time_str)
 
     def next(self, candle):
-        t = candle['time'].time()
-        curr_high = candle['high']
-        curr_low = candle['low']
-        curr_close = candle['close']
+        minute = _minute_of_day(candle.time)
+        position = self.position
+        # Off-session and flat: resetting the range is all next() would do, and only the
+        # first such candle after the range was armed actually changes anything
+        bucket = self._session_lut[minute]
+        if position is None and not bucket:
+            if self.range_set:
+                self.range_set = False
+                self.asian_high = -1.0
+                self.asian_low = float('inf')
+            return None
+
+        curr_close = candle.close
         
-        # Session Logic using helper
-        is_asian = self.is_session_active(t, self.asian_start, self.asian_end)
-        is_trade = self.is_session_active(t, self.asian_end, self.trade_end)
+        # Session Logic from the bucket bits
+        is_asian = bucket & SESSION_ASIAN
+        is_trade = bucket & SESSION_TRADE
+        asian_high = self.asian_high
+        asian_low = self.asian_low
         
         # 1. Define Range during Asian Session
         # Special check: If we just started script mid-session, we might not have 'exact start'
         # But for 'defining range', we usually want to track high/low continuously during Asian
         if is_asian:
-            self.asian_high = max(self.asian_high, curr_high)
-            self.asian_low = min(self.asian_low, curr_low)
+            curr_high = candle.high
+            curr_low = candle.low
+            if curr_high > asian_high:
+                asian_high = curr_high
+            if curr_low < asian_low:
+                asian_low = curr_low
+            self.asian_high = asian_high
+            self.asian_low = asian_low
             self.range_set = True
             
-        # 2. Reset Range if day over (or specific end time)
-        # Simple check: If NOT asian and NOT trade, reset
-        # Or specifically if we pass trade_end.
-        # Let's say if we are past Trade End and not in Asian.
-        # But 'past' is tricky with midnight. 
-        # Safer: If neither session is active, reset.
-        if not is_asian and not is_trade and self.position is None:
-             self.range_set = False
-             self.asian_high = -1.0
-             self.asian_low = float('inf')
+        # 2. Reset Range if day over: neither session active while flat is exactly the
+        # early-return case above, so nothing is left to reset here.
 
         # 3. Entry Logic
-        if self.position is None and is_trade and self.range_set:
-            sl_dist_price = self.sl_pips * self.PIP_VAL
-            tp_dist_price = self.tp_pips * self.PIP_VAL
-            
+        if position is None and is_trade and self.range_set:
             signal = None
-            if curr_close > self.asian_high: # Long
+            if curr_close > asian_high: # Long
                 entry_price = curr_close
-                sl_price = entry_price - sl_dist_price
-                tp_price = entry_price + tp_dist_price
+                sl_price = entry_price - self.sl_dist_price
+                tp_price = entry_price + self.tp_dist_price
                 signal = 'long'
                 
-            elif curr_close < self.asian_low: # Short
+            elif curr_close < asian_low: # Short
                 entry_price = curr_close
-                sl_price = entry_price + sl_dist_price
-                tp_price = entry_price - tp_dist_price
+                sl_price = entry_price + self.sl_dist_price
+                tp_price = entry_price - self.tp_dist_price
                 signal = 'short'
                 
             if signal:
@@ -100,7 +328,7 @@ class GoldBreakout(Strategy):
                 return self.signal_entry(signal, entry_price, sl_price, tp_price, comment="Breakout")
         
         # 4. Exit / Time Exit
-        if self.position:
+        if position:
             # If trade session ended, close.
             if not is_trade:
                  return self.signal_exit(curr_close, reason="Session Close")
@@ -111,6 +339,123 @@ class GoldBreakout(Strategy):
         # self.save_state() 
         return None
 
+    def _replay_njit(self, df):
+        """
+        Compiled replay: only the range state carries over between candles (replay never
+        opens positions), so the whole history runs through _next_kernel in one call.
+        """
+        state = self._kernel_state()
+        _replay_range(
+            _minute_of_day(df['time'].dt).to_numpy(np.int64),
+            df['high'].to_numpy(np.float64),
+            df['low'].to_numpy(np.float64),
+            df['close'].to_numpy(np.float64),
+            state,
+            self.asian_start_min,
+            self.asian_end_min,
+            self.trade_end_min,
+        )
+        self.asian_high = float(state[STATE_ASIAN_HIGH])
+        self.asian_low = float(state[STATE_ASIAN_LOW])
+        self.range_set = bool(state[STATE_RANGE_SET])
+
+    def _kernel_state(self):
+        """Current state as a _next_kernel state array."""
+        state = np.empty(STATE_SIZE, dtype=np.float64)
+        state[STATE_ASIAN_HIGH] = self.asian_high
+        state[STATE_ASIAN_LOW] = self.asian_low
+        state[STATE_RANGE_SET] = self.range_set
+        state[STATE_HAS_POSITION] = self.position is not None
+        return state
+
+    def backtest(self, df):
+        """
+        Entry signals next() would emit over df (time/high/low/close columns) while flat,
+        computed with array operations instead of a per-candle call.
+        Returns one row per signal: time, type, price, sl, tp.
+        """
+        minutes = _minute_of_day(df['time'].dt).to_numpy(np.int64)
+        highs = df['high'].to_numpy(np.float64)
+        lows = df['low'].to_numpy(np.float64)
+        closes = df['close'].to_numpy(np.float64)
+
+        buckets = np.frombuffer(self._session_lut, dtype=np.uint8)[minutes]
+        is_asian = (buckets & SESSION_ASIAN) != 0
+        is_trade = (buckets & SESSION_TRADE) != 0
+
+        # Every candle outside both sessions resets the range, so the range at any candle is
+        # the running max/min of Asian highs/lows since the last reset
+        segment = np.cumsum(~is_asian & ~is_trade)
+        asian_high = pd.Series(np.where(is_asian, highs, -np.inf)).groupby(segment).cummax().to_numpy()
+        asian_low = pd.Series(np.where(is_asian, lows, np.inf)).groupby(segment).cummin().to_numpy()
+        range_set = np.isfinite(asian_high)
+
+        is_long = is_trade & range_set & (closes > asian_high)
+        is_short = is_trade & range_set & ~is_long & (closes < asian_low)
+        entry = is_long | is_short
+
+        price = closes[entry]
+        direction = np.where(is_long[entry], 1.0, -1.0)
+        return pd.DataFrame({
+            'time': df['time'].to_numpy()[entry],
+            'type': np.where(direction > 0, 'long', 'short'),
+            'price': price,
+            'sl': price - direction * self.sl_dist_price,
+            'tp': price + direction * self.tp_dist_price,
+        })
+
+    def backtest_all(self, df):
+        """
+        Full trade simulation over df (time/high/low/close columns) via the parallel
+        backtest_all kernel. Days are cut at the Asian session start; the off-session candles
+        before it normally reset a flat strategy, and where they do not (data gaps, a trade
+        held over the cut) the kernel carries the state into the next day.
+        Returns one row per trade: time, type, price, sl, tp, exit_time, exit_price, reason.
+        A trade still open at the end of the history comes back with reason 'Open' and
+        NaT/NaN exit time/price.
+        """
+        times = df['time']
+        minutes = _minute_of_day(times.dt).to_numpy(np.int64)
+        closes = df['close'].to_numpy(np.float64)
+
+        # Trading-day number: wall-clock minutes since the epoch (the same clock as `minutes`,
+        # so tz-aware times are not cut in UTC), shifted so days roll over at asian_start
+        wall_times = times.dt.tz_localize(None) if times.dt.tz is not None else times
+        epoch_minutes = wall_times.to_numpy('datetime64[m]').astype(np.int64)
+        day_ids = (epoch_minutes - self.asian_start_min) // (24 * 60)
+        day_starts = np.flatnonzero(np.diff(day_ids, prepend=day_ids[:1] - 1) != 0)
+        day_starts = np.append(day_starts, len(closes)).astype(np.int64)
+
+        direction, exit_idx, exit_px, reason = backtest_all(
+            minutes,
+            df['high'].to_numpy(np.float64),
+            df['low'].to_numpy(np.float64),
+            closes,
+            day_starts,
+            self.asian_start_min,
+            self.asian_end_min,
+            self.trade_end_min,
+            self.sl_dist_price,
+            self.tp_dist_price,
+        )
+
+        entry = np.flatnonzero(direction != 0)
+        side = direction[entry].astype(np.float64)
+        price = closes[entry]
+        time_values = times.to_numpy()
+        exits = exit_idx[entry]
+        is_open = exits < 0
+        return pd.DataFrame({
+            'time': time_values[entry],
+            'type': np.where(side > 0, 'long', 'short'),
+            'price': price,
+            'sl': price - side * self.sl_dist_price,
+            'tp': price + side * self.tp_dist_price,
+            'exit_time': np.where(is_open, np.datetime64('NaT'), time_values[exits]),
+            'exit_price': exit_px[entry],
+            'reason': np.where(is_open, 'Open', EXIT_REASONS[reason[entry]]),
+        })
+
     def get_additional_state(self):
         return {
             'asian_high': self.asian_high,
@@ -120,6 +465,8 @@ class GoldBreakout(Strategy):
 
     def set_additional_state(self, state):
         self.asian_high = state.get('asian_high', -1.0)
-        self.asian_low = state.get('asian_low', float('inf'))
+        # JSON has no infinity: the "no range yet" low comes back as null
+        asian_low = state.get('asian_low')
+        self.asian_low = float('inf') if asian_low is None else asian_low
         self.range_set = state.get('range_set', False)
 
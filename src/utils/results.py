@@ -1,56 +1,152 @@
 import os
+import atexit
 import csv
 import json
 import logging
+import logging.handlers
+import queue
+from contextlib import contextmanager
 from datetime import datetime
+from operator import itemgetter
 from pathlib import Path
 from src.production.config import config
+try:
+    import orjson
+except ImportError:
+    orjson = None
+try:
+    # Columnar trade logs (save_trades_parquet)
+    import pyarrow as pa
+    import pyarrow.parquet as pa_parquet
+except ImportError:
+    pa = None
 
 logger = logging.getLogger(__name__)
 
+# One timestamp per process run, so every strategy started in it shares the same run stamp
+_RUN_TS = datetime.now().strftime("%Y-%m-%d_%H-%M")
+
 class ResultManager:
+    # (queue handler, listener) on the root logger by log path, so repeated managers for a
+    # run share one
+    _log_handlers = {}
+
     def __init__(self, strategy_name="Strategy"):
         self.base_dir = Path(config.get("PATHS", {}).get("RESULTS_DIR", "results"))
-        self.timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M")
+        self.timestamp = _RUN_TS
         self.run_dir = self.base_dir / f"{self.timestamp}-{strategy_name}"
         
         self.ensure_dir()
         self.setup_logging()
 
+    @classmethod
+    def new_run(cls):
+        """Start a new run: ResultManagers created after this get a fresh timestamp."""
+        global _RUN_TS
+        _RUN_TS = datetime.now().strftime("%Y-%m-%d_%H-%M")
+        return _RUN_TS
+
     def ensure_dir(self):
         self.run_dir.mkdir(parents=True, exist_ok=True)
 
     def setup_logging(self):
-        log_file = self.run_dir / "run.log"
+        log_file = (self.run_dir / "run.log").resolve()
+        if log_file in self._log_handlers:
+            return
+
         file_handler = logging.FileHandler(log_file)
         formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
         file_handler.setFormatter(formatter)
+
+        # The root logger only enqueues; a listener thread does the file writes
+        log_queue = queue.Queue(-1)
+        queue_handler = logging.handlers.QueueHandler(log_queue)
+        listener = logging.handlers.QueueListener(log_queue, file_handler)
+        listener.start()
+        atexit.register(listener.stop)
         
         # Add to root logger
-        logging.getLogger().addHandler(file_handler)
+        logging.getLogger().addHandler(queue_handler)
+        self._log_handlers[log_file] = (queue_handler, listener)
         logger.info(f"Logging initialized in {self.run_dir}")
 
+    def close(self):
+        """Detach this run's log handler, flush what is queued and close the file."""
+        handlers = self._log_handlers.pop((self.run_dir / "run.log").resolve(), None)
+        if handlers is not None:
+            queue_handler, listener = handlers
+            logging.getLogger().removeHandler(queue_handler)
+            atexit.unregister(listener.stop)
+            listener.stop()
+            for file_handler in listener.handlers:
+                file_handler.close()
+
     def save_trades(self, trades_list):
         if not trades_list:
             return
             
         csv_path = self.run_dir / "trades.csv"
-        keys = trades_list[0].keys()
+        keys = list(trades_list[0].keys())
+        # Uniform rows go out as tuples in header order (itemgetter does the per-field lookups
+        # in C); otherwise DictWriter blanks missing fields and rejects unknown ones
+        first_keys = trades_list[0].keys()
+        uniform = all(t.keys() == first_keys for t in trades_list)
         
         try:
             with open(csv_path, 'w', newline='') as f:
-                dict_writer = csv.DictWriter(f, fieldnames=keys)
-                dict_writer.writeheader()
-                dict_writer.writerows(trades_list)
+                if uniform:
+                    get_row = itemgetter(*keys)
+                    writer = csv.writer(f)
+                    writer.writerow(keys)
+                    writer.writerows(map(get_row, trades_list) if len(keys) > 1
+                                     else ((get_row(t),) for t in trades_list))
+                else:
+                    dict_writer = csv.DictWriter(f, fieldnames=keys)
+                    dict_writer.writeheader()
+                    dict_writer.writerows(trades_list)
             logger.info(f"Trades saved to {csv_path}")
         except Exception as e:
             logger.error(f"Failed to save trades: {e}")
 
+    def save_trades_parquet(self, trades_list):
+        """Save trades as zstd-compressed trades.parquet; falls back to save_trades without pyarrow."""
+        if not trades_list:
+            return
+        if pa is None:
+            logger.warning("pyarrow not installed, saving trades as CSV instead")
+            self.save_trades(trades_list)
+            return
+
+        parquet_path = self.run_dir / "trades.parquet"
+        try:
+            pa_parquet.write_table(pa.Table.from_pylist(trades_list), parquet_path, compression="zstd")
+            logger.info(f"Trades saved to {parquet_path}")
+        except Exception as e:
+            logger.error(f"Failed to save trades: {e}")
+
+    @contextmanager
+    def trade_writer(self, fieldnames):
+        """
+        Stream trades to trades.csv as they close instead of collecting them for save_trades.
+        Yields a callable taking one row as a sequence in `fieldnames` order.
+        """
+        csv_path = self.run_dir / "trades.csv"
+        with open(csv_path, 'w', newline='', buffering=1 << 20) as f:
+            writer = csv.writer(f)
+            writer.writerow(fieldnames)
+            yield writer.writerow
+        logger.info(f"Trades saved to {csv_path}")
+
     def save_performance(self, metrics_dict):
         json_path = self.run_dir / "performance.json"
         try:
-            with open(json_path, 'w') as f:
-                json.dump(metrics_dict, f, indent=4)
+            if orjson is not None:
+                data = orjson.dumps(metrics_dict, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY)
+            else:
+                # Same layout as orjson's output, so the file doesn't depend on what's installed
+                data = json.dumps(metrics_dict, indent=2).encode()
+            with open(json_path, 'wb') as f:
+                f.write(data)
             logger.info(f"Performance metrics saved to {json_path}")
         except Exception as e:
             logger.error(f"Failed to save performance: {e}")
@@ -1,15 +1,19 @@
 import sys
 from pathlib import Path
 from datetime import time, datetime
-import pytz
+from zoneinfo import ZoneInfo
 
 # Add src to path
 sys.path.append(str(Path(__file__).parent.parent))
 
 from src.production.config import config
-from src.strategies.gold_breakout import GoldBreakout
+from src.strategies.base import Candle
+from src.strategies.gold_breakout import GoldBreakout, _session_buckets
 from src.utils.results import ResultManager
 
+IST = ZoneInfo("Asia/Kolkata")
+ATHENS = ZoneInfo("Europe/Athens")
+
 def test_config_loading():
     print("Testing Config Loading...")
     assert config is not None
@@ -20,22 +24,34 @@ def test_timezone_conversion():
     print("Testing Timezone Conversion...")
     # IST 03:30 -> Athens ??
     # Today
-    ist = pytz.timezone("Asia/Kolkata")
-    athens = pytz.timezone("Europe/Athens")
-    
     t_ist = time(3, 30)
     t_athens = config.convert_to_broker_time(t_ist)
     
     # Verify manually
-    now = datetime.now()
-    dt_ist = ist.localize(datetime.combine(now.date(), t_ist))
-    dt_athens = dt_ist.astimezone(athens)
+    now = datetime.now(IST)
+    dt_athens = datetime.combine(now.date(), t_ist, tzinfo=IST).astimezone(ATHENS)
     
     print(f"IST: {t_ist} -> Athens: {t_athens}")
     assert t_athens.hour == dt_athens.time().hour
     assert t_athens.minute == dt_athens.time().minute
     print("PASS: Timezone conversion matches.")
 
+def test_series_conversion_dst_gap():
+    print("Testing vectorized broker-time conversion...")
+    import copy
+    import pandas as pd
+    # A user zone with DST: 01:30 on 2024-03-31 does not exist in London and shifts to 02:00
+    london = ZoneInfo("Europe/London")
+    cfg = copy.copy(config)
+    cfg.user_tz = london
+    series = pd.Series(pd.to_datetime(["2024-03-30 12:00", "2024-03-31 01:30"]), name="time")
+    converted = cfg.convert_series_to_broker_time(series)
+
+    expected = [datetime(2024, 3, 30, 12, 0, tzinfo=london), datetime(2024, 3, 31, 2, 0, tzinfo=london)]
+    assert [t.to_pydatetime() for t in converted] == [t.astimezone(cfg.broker_tz) for t in expected]
+    assert str(converted.dt.tz) == cfg.broker_tz_name and converted.name == "time"
+    print("PASS: DST-gap wall times shift forward.")
+
 def test_strategy_init():
     print("Testing Strategy Initialization...")
     strat = GoldBreakout(config)
@@ -48,6 +64,199 @@ def test_strategy_init():
     assert strat.asian_start != time(3, 30) # Should be different unless coincidentally same offset
     print("PASS: Strategy initialized with converted times.")
 
+def test_replay_matches_next():
+    print("Testing Strategy Replay...")
+    import pandas as pd
+    times = pd.date_range("2024-03-25", periods=300, freq="15min")
+    prices = pd.Series(range(300), dtype=float) % 37 + 2000.0
+    df = pd.DataFrame({'time': times, 'open': prices, 'high': prices + 0.5,
+                       'low': prices - 0.5, 'close': prices, 'vol': 0})
+
+    looped = GoldBreakout(config)
+    looped.on_init()
+    looped.persist_state = False  # next() saves on entry signals; keep the test side-effect free
+    for row in df.itertuples(index=False, name=None):
+        looped.next(Candle._make(row))
+
+    replayed = GoldBreakout(config)
+    replayed.on_init()
+    replayed.replay(df)
+
+    assert replayed.get_additional_state() == looped.get_additional_state()
+    print("PASS: Replay state matches candle-by-candle next().")
+
+# Broker-time minute-of-day session layouts: the configured one, and one crossing midnight
+SESSION_LAYOUTS = [None, (22 * 60, 2 * 60, 10 * 60)]
+
+def _synthetic_candles(n=3000, seed=1):
+    import numpy as np
+    import pandas as pd
+    rng = np.random.default_rng(seed)
+    closes = 2000.0 + np.cumsum(rng.normal(0, 2.5, n))
+    return pd.DataFrame({'time': pd.date_range("2024-03-01", periods=n, freq="15min"),
+                         'open': closes, 'high': closes + rng.random(n) * 2,
+                         'low': closes - rng.random(n) * 2, 'close': closes, 'vol': 0})
+
+def _fresh_strategy(sessions=None):
+    strat = GoldBreakout(config)
+    strat.on_init()
+    strat.persist_state = False
+    # Start flat with no range, whatever state on_init resumed
+    strat.position = None
+    strat.set_additional_state({})
+    if sessions:
+        strat.asian_start_min, strat.asian_end_min, strat.trade_end_min = sessions
+        strat._session_lut = _session_buckets(*sessions)
+    return strat
+
+def _next_loop_trades(strat, df):
+    """Trades from calling next() per candle, with SL then TP checked on the candle's extremes first."""
+    import pandas as pd
+    trades = []
+    pos = None
+    for row in df[list(Candle._fields)].itertuples(index=False, name=None):
+        candle = Candle._make(row)
+        if pos is not None:
+            side = 1 if pos['type'] == 'long' else -1
+            adverse = candle.low if side > 0 else candle.high
+            favourable = candle.high if side > 0 else candle.low
+            if side * (pos['sl'] - adverse) >= 0:
+                trades.append({**pos, 'exit_time': candle.time, 'exit_price': pos['sl'], 'reason': 'SL'})
+                pos = None
+            elif side * (favourable - pos['tp']) >= 0:
+                trades.append({**pos, 'exit_time': candle.time, 'exit_price': pos['tp'], 'reason': 'TP'})
+                pos = None
+
+        strat.position = pos
+        signal = strat.next(candle)
+        if signal and signal['action'] == 'EXIT':
+            trades.append({**pos, 'exit_time': candle.time, 'exit_price': signal['price'], 'reason': 'Session Close'})
+            pos = None
+        elif signal and signal['action'] == 'ENTRY':
+            pos = {'time': candle.time, 'type': signal['type'], 'price': signal['price'],
+                   'sl': signal['sl'], 'tp': signal['tp']}
+    if pos is not None:
+        trades.append({**pos, 'exit_time': pd.NaT, 'exit_price': float('nan'), 'reason': 'Open'})
+    return pd.DataFrame(trades, columns=['time', 'type', 'price', 'sl', 'tp', 'exit_time', 'exit_price', 'reason'])
+
+def test_backtest_all_matches_next():
+    print("Testing parallel backtest_all...")
+    import pandas as pd
+    naive = _synthetic_candles()
+    # tz-aware times too: days must be cut on the same wall clock as the sessions
+    aware = naive.assign(time=naive['time'].dt.tz_localize("Asia/Kolkata"))
+    reasons = set()
+    for df in (naive, aware):
+        for sessions in SESSION_LAYOUTS:
+            expected = _next_loop_trades(_fresh_strategy(sessions), df)
+            trades = _fresh_strategy(sessions).backtest_all(df)
+            pd.testing.assert_frame_equal(trades, expected, check_dtype=False)
+            reasons.update(trades['reason'])
+    # The fixture hits every exit path, including a trade left open by the end of the data
+    assert reasons == {'SL', 'TP', 'Session Close', 'Open'}, reasons
+
+    # Data gaps over the off-session candles: the range (or a held trade) carries into the next day
+    for sessions in SESSION_LAYOUTS:
+        strat = _fresh_strategy(sessions)
+        lut = _session_buckets(strat.asian_start_min, strat.asian_end_min, strat.trade_end_min)
+        minutes = naive['time'].dt.hour * 60 + naive['time'].dt.minute
+        off_session = minutes.map(lambda m: lut[m] == 0)
+        gapped = naive[~(off_session & (naive['time'].dt.day % 2 == 0))].reset_index(drop=True)
+        expected = _next_loop_trades(_fresh_strategy(sessions), gapped)
+        trades = strat.backtest_all(gapped)
+        pd.testing.assert_frame_equal(trades, expected, check_dtype=False)
+    print("PASS: backtest_all trades match candle-by-candle next().")
+
+def test_backtest_matches_next():
+    print("Testing vectorized signal backtest...")
+    import pandas as pd
+    df = _synthetic_candles()
+    for sessions in SESSION_LAYOUTS:
+        # backtest() reports the entries next() signals while flat
+        looped = _fresh_strategy(sessions)
+        signals = []
+        for row in df[list(Candle._fields)].itertuples(index=False, name=None):
+            candle = Candle._make(row)
+            signal = looped.next(candle)
+            if signal:
+                signals.append((candle.time, signal['type'], signal['price'], signal['sl'], signal['tp']))
+        expected = pd.DataFrame(signals, columns=['time', 'type', 'price', 'sl', 'tp'])
+
+        signals = _fresh_strategy(sessions).backtest(df)
+        assert len(expected) > 0
+        pd.testing.assert_frame_equal(signals, expected, check_dtype=False)
+    print("PASS: backtest signals match candle-by-candle next().")
+
+def test_sweep_matches_backtest():
+    print("Testing run_gold_breakout parameter sweep...")
+    import tempfile
+    import numpy as np
+    import pandas as pd
+    import run_gold_breakout as rgb
+
+    candles = _synthetic_candles()
+    candles['time'] = candles['time'].dt.strftime('%Y-%m-%d %H:%M:%S')
+    config = {'initial_capital': 10000.0, 'mode': 'risk', 'risk_pct': 0.01, 'fixed_lots': 0.0,
+              'sl_pips': 100, 'tp_pips': 200, 'trail_trigger': 20, 'trail_dist': 5, 'duration_months': 0}
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "candles.csv"
+        candles[['time', 'open', 'high', 'low', 'close', 'vol']].round(2).to_csv(
+            path, sep='\t', header=False, index=False)
+        df = rgb.load_data(path)
+
+    # Each grid point must reproduce a plain run_backtest with those parameters
+    sl_values = [100, 60]
+    sweep = rgb.run_sweep(df, config, sl_values, [200], [20], [5])
+    for sl_pips, row in zip(sl_values, sweep.itertuples()):
+        trades, final_equity = rgb.run_backtest(df, {**config, 'sl_pips': sl_pips})
+        assert len(trades) > 0
+        assert row.n_trades == len(trades)
+        assert np.isclose(row.net_pnl, final_equity - config['initial_capital'])
+    print("PASS: Sweep grid points match run_backtest.")
+
+def test_state_round_trip():
+    print("Testing threaded state persistence...")
+    import tempfile
+    with tempfile.TemporaryDirectory() as tmp:
+        saved = _fresh_strategy()
+        saved.persist_state = True
+        saved.state_file = Path(tmp) / "state.json"
+        saved.position = {'ticket': 7, 'type': 'long'}
+        saved.equity = 12345.5
+        saved.asian_high, saved.asian_low, saved.range_set = 2010.5, 1995.25, True
+        saved.save_state()
+        saved.flush_state()
+
+        loaded = _fresh_strategy()
+        loaded.state_file = saved.state_file
+        assert loaded.load_state()
+        assert loaded.position == saved.position
+        assert loaded.equity == saved.equity
+        assert loaded.get_additional_state() == saved.get_additional_state()
+        # The writer swaps files in with os.replace, so no temp file is left behind
+        assert sorted(p.name for p in Path(tmp).iterdir()) == ["state.json"]
+    print("PASS: State survives save_state/flush_state/load_state.")
+
+def test_legacy_pickle_state():
+    print("Testing legacy pickled state...")
+    import pickle
+    import tempfile
+    legacy = {'orders': [], 'position': {'ticket': 3}, 'equity': 9000.0,
+              'asian_high': 2001.0, 'asian_low': float('inf'), 'range_set': False}
+    with tempfile.TemporaryDirectory() as tmp:
+        # Older versions pickled the state to trade_state.pkl; it is still read, by content
+        # and as the fallback for a missing .json state file
+        with open(Path(tmp) / "trade_state.pkl", 'wb') as f:
+            pickle.dump(legacy, f)
+        strat = _fresh_strategy()
+        strat.state_file = Path(tmp) / "trade_state.json"
+        assert strat.load_state()
+        assert strat.position == legacy['position'] and strat.equity == legacy['equity']
+        assert strat.get_additional_state() == {k: legacy[k] for k in ('asian_high', 'asian_low', 'range_set')}
+    assert GoldBreakout._parse_state(pickle.dumps(legacy)) == legacy
+    assert GoldBreakout._parse_state(GoldBreakout._dump_state({'equity': 1.0})) == {'equity': 1.0}
+    print("PASS: Legacy pickled state loads.")
+
 def test_result_manager():
     print("Testing ResultManager...")
     rm = ResultManager("TestRun")
@@ -57,12 +266,66 @@ def test_result_manager():
     assert (path / "run.log").exists()
     print("PASS: ResultManager created format.")
 
+def test_save_trades():
+    print("Testing ResultManager.save_trades...")
+    import pandas as pd
+    rm = ResultManager("TestRun")
+    trades = [{'time': '2024-01-01 09:00:00', 'type': 'long', 'pnl': 12.5},
+              {'time': '2024-01-01 15:00:00', 'type': 'short', 'pnl': -4.0}]
+    rm.save_trades(trades)
+    assert pd.read_csv(rm.get_run_dir() / "trades.csv").to_dict('records') == trades
+
+    # Rows missing a field still get written, with the field left blank
+    rm.save_trades(trades + [{'time': '2024-01-02 09:00:00', 'type': 'long'}])
+    saved = pd.read_csv(rm.get_run_dir() / "trades.csv")
+    assert saved['pnl'].iloc[:2].tolist() == [12.5, -4.0] and pd.isna(saved['pnl'].iloc[2])
+    print("PASS: save_trades writes uniform and ragged rows.")
+
+def test_trade_writer():
+    print("Testing ResultManager.trade_writer...")
+    import pandas as pd
+    rm = ResultManager("TestRun")
+    rows = [('2024-01-01 09:00:00', 'long', 12.5), ('2024-01-01 15:00:00', 'short', -4.0)]
+    with rm.trade_writer(('time', 'type', 'pnl')) as write_trade:
+        for row in rows:
+            write_trade(row)
+    saved = pd.read_csv(rm.get_run_dir() / "trades.csv")
+    assert list(saved.columns) == ['time', 'type', 'pnl']
+    assert list(saved.itertuples(index=False, name=None)) == rows
+    print("PASS: trade_writer rows read back.")
+
+def test_save_trades_parquet():
+    print("Testing ResultManager.save_trades_parquet...")
+    import pandas as pd
+    from src.utils import results
+    rm = ResultManager("TestRun")
+    trades = [{'time': pd.Timestamp('2024-01-01 09:00'), 'type': 'long', 'pnl': 12.5},
+              {'time': pd.Timestamp('2024-01-01 15:00'), 'type': 'short', 'pnl': -4.0}]
+    rm.save_trades_parquet(trades)
+    if results.pa is None:
+        # Without pyarrow the trades land in the CSV instead
+        saved = pd.read_csv(rm.get_run_dir() / "trades.csv", parse_dates=['time'])
+    else:
+        saved = pd.read_parquet(rm.get_run_dir() / "trades.parquet")
+    pd.testing.assert_frame_equal(saved, pd.DataFrame(trades), check_dtype=False)
+    print("PASS: save_trades_parquet rows read back.")
+
 if __name__ == "__main__":
     try:
         test_config_loading()
         test_timezone_conversion()
+        test_series_conversion_dst_gap()
         test_strategy_init()
+        test_replay_matches_next()
+        test_backtest_matches_next()
+        test_backtest_all_matches_next()
+        test_sweep_matches_backtest()
+        test_state_round_trip()
+        test_legacy_pickle_state()
         test_result_manager()
+        test_save_trades()
+        test_trade_writer()
+        test_save_trades_parquet()
         print("\nALL TESTS PASSED")
     except Exception as e:
         print(f"\nTEST FAILED: {e}")